@@ -0,0 +1,49 @@
+"""Per-cell cost of rendering a cell with several mapped properties.
+
+Compares calling each mapper (one ``set_property`` per property) with the
+compiled mappers (one ``set_properties`` call).
+
+    python examples/benchmarks/cell_render.py [repeat]
+"""
+import sys
+import timeit
+
+import gtk
+from pygtkhelpers.ui.objectlist import Cell
+
+
+class Item(object):
+    def __init__(self, i):
+        self.name = 'item %d' % i
+        self.weight = 400 + i % 300
+        self.foreground = '#%06x' % (i * 4099 % 0xffffff)
+        self.visible = bool(i % 2)
+
+
+def main(repeat=100000):
+    cell = Cell('name', format_func=lambda name: name.title(),
+                mapped={'weight': 'weight', 'foreground': 'foreground',
+                        'visible': 'visible'})
+    renderer = gtk.CellRendererText()
+    items = [Item(i) for i in xrange(1000)]
+
+    def interpreted():
+        for item in items:
+            for mapper in cell.mappers:
+                mapper(cell, item, renderer)
+
+    cell.compile()
+
+    def compiled():
+        for item in items:
+            cell.render(item, renderer)
+
+    for name, func in (('interpreted', interpreted), ('compiled', compiled)):
+        number = max(repeat // len(items), 1)
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        print '%-12s %.2f us/cell' % (name, seconds / (number * len(items))
+                                      * 1e6)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,41 @@
+"""Attribute access to the rows of a CombinedFields list.
+
+Reads (as the cell data functions do when rendering) and writes every
+column of every row, for a grid of forms with many fields.
+
+    python examples/benchmarks/combined_rows.py [n_rows] [n_forms] [n_fields]
+"""
+import sys
+import time
+
+from flatland import Form, Integer
+from pygtkhelpers.ui.objectlist import CombinedFields, CombinedRow
+
+
+def main(n_rows=2000, n_forms=10, n_fields=30):
+    forms = dict(('form%d' % i,
+                  Form.of(*[Integer.named('field%d' % j).using(default=j)
+                            for j in xrange(n_fields)]))
+                 for i in xrange(n_forms))
+    combined_fields = CombinedFields(forms, enabled_attrs=None)
+    rows = [CombinedRow(combined_fields) for i in xrange(n_rows)]
+    attrs = [column.attr for column in combined_fields.columns]
+    n_cells = len(rows) * len(attrs)
+
+    start = time.time()
+    for row in rows:
+        for attr in attrs:
+            getattr(row, attr)
+    seconds = time.time() - start
+    print 'read   %.3f s (%.0f cells/s)' % (seconds, n_cells / seconds)
+
+    start = time.time()
+    for row in rows:
+        for attr in attrs:
+            setattr(row, attr, 1)
+    seconds = time.time() - start
+    print 'write  %.3f s (%.0f cells/s)' % (seconds, n_cells / seconds)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,52 @@
+"""Loading data frames with mixed dtypes into a ``gtk.ListStore``.
+
+Compares converting one row at a time with ``iterrows()`` (the previous
+implementation of ``get_list_store``) with ``get_list_store``, and times
+``get_frame_model``, which does not copy the data.
+
+    python examples/benchmarks/list_store_loading.py [max_rows]
+"""
+import sys
+import time
+
+import gtk
+import numpy as np
+import pandas as pd
+from pygtkhelpers.ui.objectlist import (get_py_dtypes, get_list_store,
+                                        get_frame_model)
+
+
+def make_frame(n_rows):
+    return pd.DataFrame({'name': ['row %d' % i for i in xrange(n_rows)],
+                         'count': np.arange(n_rows),
+                         'value': np.random.rand(n_rows),
+                         'select': np.arange(n_rows) % 2 == 0},
+                        columns=['name', 'count', 'value', 'select'])
+
+
+def iterrows_list_store(data_frame):
+    df_py_dtypes = get_py_dtypes(data_frame)
+    list_store = gtk.ListStore(*df_py_dtypes.dtype)
+    for i, row_i in data_frame.iterrows():
+        list_store.append(row_i.tolist())
+    return df_py_dtypes, list_store
+
+
+def main(max_rows=1000000):
+    n_rows = 10000
+    while n_rows <= max_rows:
+        data_frame = make_frame(n_rows)
+        print '%d rows' % n_rows
+        for name, func in (('iterrows', iterrows_list_store),
+                           ('get_list_store', get_list_store),
+                           ('get_frame_model', get_frame_model)):
+            if name == 'iterrows' and n_rows > 100000:
+                continue
+            start = time.time()
+            func(data_frame)
+            print '  %-16s %.3f s' % (name, time.time() - start)
+        n_rows *= 10
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,46 @@
+"""Refreshing a list with a few changed rows.
+
+Compares ``clear()`` followed by ``extend()`` with ``set_items()``, for a
+list where a few items are removed, added and moved on each refresh.
+
+    python examples/benchmarks/set_items.py [n_items]
+"""
+import random
+import sys
+import time
+
+from pygtkhelpers.ui.objectlist import Column, ObjectList
+
+
+class Row(object):
+    def __init__(self, i):
+        self.name = 'row %d' % i
+
+
+def refreshes(n_items, n_changes=10, n_refreshes=20):
+    rows = [Row(i) for i in xrange(n_items)]
+    random.seed(0)
+    for refresh in xrange(n_refreshes):
+        rows = rows[n_changes:]
+        rows.extend(Row(n_items + refresh * n_changes + i)
+                    for i in xrange(n_changes))
+        i, j = random.sample(xrange(len(rows)), 2)
+        rows[i], rows[j] = rows[j], rows[i]
+        yield list(rows)
+
+
+def main(n_items=10000):
+    for name in ('clear+extend', 'set_items'):
+        objectlist = ObjectList([Column('name', str)])
+        start = time.time()
+        for rows in refreshes(n_items):
+            if name == 'set_items':
+                objectlist.set_items(rows)
+            else:
+                objectlist.clear()
+                objectlist.extend(rows)
+        print '%-14s %.3f s' % (name, time.time() - start)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
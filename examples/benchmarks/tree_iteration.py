@@ -0,0 +1,62 @@
+"""Iteration of deep and wide ObjectTrees.
+
+Times iterating all items, reading the selected items of a fully selected
+(collapsed) tree, and checking and getting subtrees, for a tree of long
+chains of nested items and for a tree with many top-level items.
+
+    python examples/benchmarks/tree_iteration.py [n_items]
+"""
+import sys
+import time
+
+import gtk
+from pygtkhelpers.ui.objectlist import Column, ObjectTree
+
+
+class Node(object):
+    def __init__(self, name):
+        self.name = name
+
+
+def deep_tree(n_items, depth=200):
+    tree = ObjectTree([Column('name', str)])
+    parent = None
+    for i in xrange(n_items):
+        if i % depth == 0:
+            parent = None
+        node = Node('node %d' % i)
+        tree.append(node, parent=parent)
+        parent = node
+    return tree
+
+
+def wide_tree(n_items):
+    tree = ObjectTree([Column('name', str)])
+    tree.extend(Node('node %d' % i) for i in xrange(n_items))
+    return tree
+
+
+def timed(func, *args):
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+
+def main(n_items=20000):
+    for shape, make_tree in (('deep', deep_tree), ('wide', wide_tree)):
+        tree = make_tree(n_items)
+        tree.get_selection().set_mode(gtk.SELECTION_MULTIPLE)
+        items = list(tree)
+        top_level = tree._child_items()
+        tree.get_selection().select_all()
+        print '%s tree (%d items)' % (shape, len(items))
+        print '  iterate       %.3f s' % timed(list, tree)
+        print '  selected      %.3f s' % timed(lambda: tree.selected_items)
+        print '  is_subtree    %.3f s' % timed(tree.is_subtree, items)
+        print '  get_subtree   %.3f s' % timed(tree.get_subtree,
+                                              list(tree._iter_children(
+                                                  top_level[-1])))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
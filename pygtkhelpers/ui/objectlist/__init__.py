@@ -9,12 +9,18 @@
     :copyright: 2005-2008 by pygtkhelpers Authors
     :license: LGPL 2 or later (see README/COPYING/LICENSE)
 """
-from si_prefix import si_format, si_parse
+from itertools import izip
+
+from si_prefix import si_format, si_parse, SI_PREFIX_UNITS
 import gtk
 import numpy as np
 
 from .column import PropertyMapper, Cell, Column
-from .view import ObjectList, ObjectTree
+from .view import ObjectList, ObjectTree, SubObjectTree, CopyOnWrite
+from .virtual import VirtualObjectList, VirtualListModel, SequenceSource
+from .dataframe import DataFrameTreeModel
+from .chunked import (ChunkedTable, ChunkedTableModel, NpyChunkReader,
+                      HDFChunkReader, ParquetChunkReader)
 from .combined_fields import *
 
 
@@ -37,6 +43,16 @@ def get_py_dtype(np_dtype):
         return type(np_dtype.type(0))
 
 
+def _is_str_column(values):
+    try:
+        from pandas.api.types import infer_dtype
+    except ImportError:
+        # pandas < 0.20
+        from pandas.lib import infer_dtype
+    # Every value is checked, in a single compiled pass over the column.
+    return infer_dtype(values) in ('string', 'empty')
+
+
 def get_py_dtypes(data_frame):
     '''
     Return a `pandas.DataFrame` containing Python type information for the
@@ -52,12 +68,16 @@ def get_py_dtypes(data_frame):
             `data_frame`, with the columns `'i'` and `'dtype'` indicating the
             index and Python type of the corresponding `data_frame` column,
             respectively.
+
+    .. versionchanged:: X.X.X
+        Infer the type of object columns with `pandas` (rather than checking
+        each value in Python).
     '''
     df_py_dtypes = data_frame.dtypes.map(get_py_dtype).to_frame('dtype').copy()
     df_py_dtypes.loc[df_py_dtypes.dtype == object, 'dtype'] = \
         (df_py_dtypes.loc[df_py_dtypes.dtype == object].index
-         .map(lambda c: str if data_frame[c]
-              .map(lambda v: isinstance(v, str)).all() else object))
+         .map(lambda c: str if _is_str_column(data_frame[c].values)
+              else object))
 
     df_py_dtypes.insert(0, 'i', range(df_py_dtypes.shape[0]))
     df_py_dtypes.index.name = 'column'
@@ -79,14 +99,71 @@ def get_list_store(data_frame):
         (tuple) : The first element is a data frame as returned by
             `get_py_dtypes` and the second element is a `gtk.ListStore`
             matching the contents of the data frame.
+
+    .. versionchanged:: X.X.X
+        Convert whole columns to Python values at once, rather than one row
+        at a time.
     '''
     df_py_dtypes = get_py_dtypes(data_frame)
     list_store = gtk.ListStore(*df_py_dtypes.dtype)
-    for i, row_i in data_frame.iterrows():
-        list_store.append(row_i.tolist())
+    # `tolist()` converts the values to Python types in a single pass.
+    columns = [data_frame.iloc[:, i].values.tolist()
+               for i in xrange(data_frame.shape[1])]
+    append = list_store.append
+    for row_i in izip(*columns):
+        append(row_i)
     return df_py_dtypes, list_store
 
 
+def get_frame_model(data_frame):
+    '''
+    Return a `pandas.DataFrame` containing Python type information for the
+    columns in `data_frame` and a `DataFrameTreeModel` showing the contents of
+    the data frame.
+
+    Unlike `get_list_store`, the data is not copied: the model reads its cells
+    from the data frame.
+
+    Args:
+
+        data_frame (pandas.DataFrame) : Data frame containing data columns.
+
+    Returns:
+
+        (tuple) : The first element is a data frame as returned by
+            `get_py_dtypes` and the second element is a `DataFrameTreeModel`
+            showing the contents of the data frame.
+
+    .. versionadded:: X.X.X
+    '''
+    df_py_dtypes = get_py_dtypes(data_frame)
+    return df_py_dtypes, DataFrameTreeModel(data_frame, df_py_dtypes)
+
+
+def get_chunked_model(table):
+    '''
+    Return a `pandas.DataFrame` containing Python type information for the
+    columns of a `ChunkedTable` and a `ChunkedTableModel` showing the table.
+
+    The types are inferred from the first chunk of the table.
+
+    Args:
+
+        table (ChunkedTable) : Table of data read in chunks.
+
+    Returns:
+
+        (tuple) : The first element is a data frame as returned by
+            `get_py_dtypes` and the second element is a `ChunkedTableModel`
+            showing the table, which may be passed to `add_columns`.
+
+    .. versionadded:: X.X.X
+    '''
+    df_py_dtypes = get_py_dtypes(table.reader.read(0, min(table.chunk_size,
+                                                          len(table))))
+    return df_py_dtypes, ChunkedTableModel(table, df_py_dtypes)
+
+
 def add_columns(tree_view, df_py_dtypes, list_store):
     '''
     Add columns to a `gtk.TreeView` for the types listed in `df_py_dtypes`.
@@ -96,7 +173,8 @@ def add_columns(tree_view, df_py_dtypes, list_store):
         tree_view (gtk.TreeView) : Tree view to append columns to.
         df_py_dtypes (pandas.DataFrame) : Data frame containing type
             information for one or more columns in `list_store`.
-        list_store (gtk.ListStore) : Model data.
+        list_store (gtk.ListStore, DataFrameTreeModel or ChunkedTableModel) :
+            Model data.
 
     Returns:
 
@@ -128,8 +206,142 @@ def add_columns(tree_view, df_py_dtypes, list_store):
         tree_view.append_column(tree_column_i)
 
 
+def _si_format_array(values, digits):
+    '''
+    Format an array of numbers like `si_format`, scaling all the values at
+    once.
+
+    Args:
+
+        values (numpy.ndarray) : Numeric values.
+        digits (int) : Number of digits after decimal.
+
+    Returns:
+
+        (numpy.ndarray) : Array of the formatted strings.
+    '''
+    values = np.asarray(values, dtype=float)
+    exponents = np.zeros(values.shape, dtype=int)
+    scaled = values.copy()
+    finite = np.isfinite(values) & (values != 0)
+    # Exponent of 10 of each value, rounded (as by `si_prefix.split`) to a
+    # multiple of 3.
+    exponents_i = np.trunc(np.log10(np.abs(values[finite]))).astype(int)
+    exponents[finite] = np.where(exponents_i > 0, exponents_i // 3 * 3,
+                                 (3 - exponents_i) // 3 * -3)
+    scaled[finite] = values[finite] * 10.0 ** -exponents[finite]
+    carry = np.abs(scaled) >= 1000
+    scaled[carry] /= 1000
+    exponents[carry] += 3
+    strings = np.char.mod(u'%%.%df' % digits, scaled)
+    prefixes = np.array([prefix.strip() for prefix in SI_PREFIX_UNITS])
+    levels = exponents // 3 + len(SI_PREFIX_UNITS) // 2
+    in_range = (levels >= 0) & (levels < len(prefixes))
+    result = np.empty(values.shape, dtype=object)
+    result[in_range] = np.char.add(np.char.add(strings[in_range], u' '),
+                                   prefixes[levels[in_range]]).tolist()
+    for i in np.flatnonzero(~in_range):
+        result[i] = u'%se%+d' % (strings[i], exponents[i])
+    return result
+
+
+class _FormattedColumn(object):
+    '''
+    Formatted strings of the values of a model column.
+
+    Each distinct value is formatted once, unless `format_values` (formatting
+    an array of values at once) is given.  The strings of changed rows are
+    formatted again, and all strings after rows are inserted, deleted or
+    reordered (on the next lookup).  Call `disconnect` to stop following the
+    model.
+    '''
+    def __init__(self, model, model_column_index, format_value,
+                 format_values=None):
+        self.model = model
+        self.model_column_index = model_column_index
+        self.format_value = format_value
+        self.format_values = format_values
+        self.strings = None
+        self._handlers = [model.connect('row-changed', self._on_row_changed)]
+        for signal in ('row-inserted', 'row-deleted', 'rows-reordered'):
+            self._handlers.append(model.connect(signal,
+                                                self._on_rows_changed))
+
+    def disconnect(self):
+        for handler in self._handlers:
+            self.model.disconnect(handler)
+        self._handlers = []
+        self.strings = None
+
+    def _values(self):
+        if isinstance(self.model, DataFrameTreeModel):
+            return self.model.column_values(self.model_column_index)
+        return [row[self.model_column_index] for row in self.model]
+
+    def _format_all(self):
+        values = self._values()
+        if self.format_values is not None:
+            return self.format_values(values).tolist()
+        try:
+            unique, inverse = np.unique(values, return_inverse=True)
+        except TypeError:
+            # Values cannot be ordered.
+            return [self.format_value(value) for value in values]
+        strings = np.array([self.format_value(value)
+                            for value in unique.tolist()], dtype=object)
+        return strings[inverse].tolist()
+
+    def _on_row_changed(self, model, path, iter):
+        if self.strings is not None:
+            value = model.get_value(iter, self.model_column_index)
+            if self.format_values is not None:
+                self.strings[path[0]] = self.format_values([value])[0]
+            else:
+                self.strings[path[0]] = self.format_value(value)
+
+    def _on_rows_changed(self, *args):
+        self.strings = None
+
+    def get(self, row):
+        if self.strings is None:
+            self.strings = self._format_all()
+        return self.strings[row]
+
+
+def _set_format_func(tree_column, model_column_index, format_value,
+                     cell_renderer, precompute, format_values=None):
+    if cell_renderer is None:
+        cells = tree_column.get_cells()
+    else:
+        cells = [cell_renderer]
+    # Stop updating the strings precomputed by a previous call.
+    previous = set(cell_renderer_i.get_data('pygtkhelpers::formatted')
+                   for cell_renderer_i in cells)
+    for formatted in previous:
+        if formatted is not None:
+            formatted.disconnect()
+    if precompute:
+        formatted = _FormattedColumn(tree_column.get_tree_view().get_model(),
+                                     model_column_index, format_value,
+                                     format_values)
+
+        def set_property(column, cell_renderer, list_store, iter, store_i):
+            cell_renderer.set_property('text', formatted
+                                       .get(list_store.get_path(iter)[0]))
+    else:
+        formatted = None
+
+        def set_property(column, cell_renderer, list_store, iter, store_i):
+            cell_renderer.set_property('text',
+                                       format_value(list_store[iter][store_i]))
+    for cell_renderer_i in cells:
+        cell_renderer_i.set_data('pygtkhelpers::formatted', formatted)
+        tree_column.set_cell_data_func(cell_renderer_i, set_property,
+                                       model_column_index)
+
+
 def set_column_format(tree_column, model_column_index, format_str,
-                      cell_renderer=None):
+                      cell_renderer=None, precompute=False):
     '''
     Set the text of a cell according to a [format][1] string.
 
@@ -145,25 +357,26 @@ def set_column_format(tree_column, model_column_index, format_str,
             the `format` method as a keyword argument.
         cell_renderer (gtk.CellRenderer) : Cell renderer for column.  If
             `None`, defaults to all cell renderers for column.
+        precompute (bool) : If `True`, format the whole column of the model of
+            the tree view at once (formatting each distinct value once), and
+            look up the formatted strings when rendering.  The strings of
+            changed rows are formatted again.  The tree view must have its
+            model set.
 
     Returns:
 
         None
+
+    .. versionchanged:: X.X.X
+        Add `precompute` argument.
     '''
-    def set_property(column, cell_renderer, list_store, iter, store_i):
-        value = list_store[iter][store_i]
-        cell_renderer.set_property('text', format_str.format(value=value))
-    if cell_renderer is None:
-        cells = tree_column.get_cells()
-    else:
-        cells = [cell_renderer]
-    for cell_renderer_i in cells:
-        tree_column.set_cell_data_func(cell_renderer_i, set_property,
-                                       model_column_index)
+    _set_format_func(tree_column, model_column_index,
+                     lambda value: format_str.format(value=value),
+                     cell_renderer, precompute)
 
 
 def set_column_si_format(tree_column, model_column_index, cell_renderer=None,
-                         digits=2):
+                         digits=2, precompute=False):
     '''
     Set the text of a numeric cell according to [SI prefixes][1]
 
@@ -179,21 +392,21 @@ def set_column_si_format(tree_column, model_column_index, cell_renderer=None,
         cell_renderer (gtk.CellRenderer) : Cell renderer for column.  If
             `None`, defaults to all cell renderers for column.
         digits (int) : Number of digits after decimal (default=2).
+        precompute (bool) : If `True`, format the whole column at once, see
+            `set_column_format`.  The values are scaled with array
+            operations, so this also helps columns of distinct values.
 
     Returns:
 
         None
+
+    .. versionchanged:: X.X.X
+        Add `precompute` argument.
     '''
-    def set_property(column, cell_renderer, list_store, iter, store_i):
-        cell_renderer.set_property('text', si_format(list_store[iter][store_i],
-                                                     digits))
-    if cell_renderer is None:
-        cells = tree_column.get_cells()
-    else:
-        cells = [cell_renderer]
-    for cell_renderer_i in cells:
-        tree_column.set_cell_data_func(cell_renderer_i, set_property,
-                                       model_column_index)
+    _set_format_func(tree_column, model_column_index,
+                     lambda value: si_format(value, digits), cell_renderer,
+                     precompute,
+                     lambda values: _si_format_array(values, digits))
 
 
 def on_edited_dataframe_sync(cell_renderer, iter, new_value, column,
@@ -221,12 +434,17 @@ def on_edited_dataframe_sync(cell_renderer, iter, new_value, column,
         column (gtk.TreeViewColumn) : Column containing edited cell.
         df_py_dtypes (pandas.DataFrame) : Data frame containing type
             information for columns in tree view (and `list_store`).
-        list_store (gtk.ListStore) : Model containing data bound to tree view.
+        list_store (gtk.ListStore or DataFrameTreeModel) : Model containing
+            data bound to tree view.
         df_data (pandas.DataFrame) : Data frame containing data in `list_store`.
 
     Returns:
 
         None
+
+    .. versionchanged:: X.X.X
+        Support `DataFrameTreeModel` models (as returned by
+        `get_frame_model`), which read the updated value from `df_data`.
     '''
     # Extract name of column (name of TreeView column must match data frame
     # column name).
@@ -242,6 +460,10 @@ def on_edited_dataframe_sync(cell_renderer, iter, new_value, column,
     if value == list_store[iter][i]:
         # Value has not changed.
         return False
+    if isinstance(list_store, DataFrameTreeModel):
+        # The model shows the data frame, so only the data frame is updated.
+        list_store.set_value(list_store.get_iter(iter), i, value)
+        return True
     list_store[iter][i] = value
     # Update the data frame with the new value.
     df_data[column_name].values[int(iter)] = value
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+"""
+    pygtkhelpers.ui.objectlist.cache
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Caches used by object lists.
+
+    :copyright: 2005-2008 by pygtkhelpers Authors
+    :license: LGPL 2 or later (see README/COPYING/LICENSE)
+"""
+
+_MISSING = object()
+
+
+class GenerationalCache(object):
+    """Bounded mapping approximating a least-recently-used eviction policy.
+
+    Entries are kept in two generations of at most ``size / 2`` entries each.
+    New entries go into the recent generation, and entries read from the old
+    generation are promoted back into the recent one.  Once the recent
+    generation is full it becomes the old generation, and the previous old
+    generation is dropped.  All operations are plain dictionary operations.
+
+    :param size: Maximum number of entries to keep.
+    :param on_evict: Optional callable, called as ``on_evict(key, value)`` for
+                     each entry dropped from the cache.
+    """
+    def __init__(self, size, on_evict=None):
+        self.size = size
+        self.on_evict = on_evict
+        self._recent = {}
+        self._old = {}
+
+    def __len__(self):
+        return len(self._recent) + len(self._old)
+
+    def __contains__(self, key):
+        return key in self._recent or key in self._old
+
+    def get(self, key, default=None):
+        try:
+            return self._recent[key]
+        except KeyError:
+            pass
+        value = self._old.pop(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        recent = self._recent
+        if key not in recent:
+            self._old.pop(key, None)
+            if len(recent) >= max(self.size // 2, 1):
+                dropped = self._old
+                self._old = recent
+                self._recent = recent = {}
+                if self.on_evict is not None:
+                    for key_i, value_i in dropped.iteritems():
+                        self.on_evict(key_i, value_i)
+        recent[key] = value
+
+    def pop(self, key, default=None):
+        value = self._recent.pop(key, _MISSING)
+        if value is _MISSING:
+            value = self._old.pop(key, default)
+        return value
+
+    def clear(self):
+        self._recent.clear()
+        self._old.clear()
+
+
+class SortKeyCache(object):
+    """Sort keys of items, computed at most once per item.
+
+    :param key: Callable returning the sort key of an item.
+    """
+    def __init__(self, key):
+        self.key = key
+        self._keys = {}
+
+    def get(self, item):
+        try:
+            return self._keys[id(item)]
+        except KeyError:
+            key = self._keys[id(item)] = self.key(item)
+            return key
+
+    def fill(self, items):
+        """Compute the keys of all items that are not cached yet."""
+        keys = self._keys
+        key = self.key
+        for item in items:
+            if id(item) not in keys:
+                keys[id(item)] = key(item)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, item):
+        # Keys are computed when first needed.
+        pass
+
+    def discard(self, item):
+        self._keys.pop(id(item), None)
+
+    def clear(self):
+        self._keys.clear()
+
+
+class VisibilityCache(SortKeyCache):
+    """Visibility of items, as decided by a predicate evaluated at most once
+    per item.
+
+    The number of cached visible and hidden items is kept up to date.
+
+    :param predicate: Callable returning whether an item is visible.
+    """
+    def __init__(self, predicate):
+        SortKeyCache.__init__(self, predicate)
+        self.n_visible = 0
+        self.n_hidden = 0
+
+    def get(self, item):
+        try:
+            return self._keys[id(item)]
+        except KeyError:
+            visible = bool(self.key(item))
+            self.set(item, visible)
+            return visible
+
+    def cached(self, item):
+        """The cached visibility of an item, or `None` if not evaluated."""
+        return self._keys.get(id(item))
+
+    def set(self, item, visible):
+        self._count(self._keys.get(id(item)), -1)
+        self._keys[id(item)] = visible
+        self._count(visible, 1)
+
+    def fill(self, items):
+        for item in items:
+            self.get(item)
+
+    def discard(self, item):
+        self._count(self._keys.pop(id(item), None), -1)
+
+    def clear(self):
+        self._keys.clear()
+        self.n_visible = self.n_hidden = 0
+
+    def _count(self, visible, delta):
+        if visible is True:
+            self.n_visible += delta
+        elif visible is False:
+            self.n_hidden += delta
+
+
+class RenderCache(object):
+    """Renderer property values of (item, cell) pairs, bounded by an
+    approximate least-recently-used policy.
+
+    Entries are stamped with the version of the cache when stored, so
+    :meth:`invalidate_all` drops every entry at once by bumping the version.
+
+    :param size: Maximum number of (item, cell) entries to keep.
+    """
+    def __init__(self, size):
+        self._cache = GenerationalCache(size)
+        self._cells = set()
+        self.version = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get(self, item, cell):
+        """The cached property values, or `None`."""
+        entry = self._cache.get((id(item), cell))
+        # Entries of removed items may remain under a reused id.
+        if entry is not None and entry[0] is item and \
+                entry[1] == self.version:
+            return entry[2]
+
+    def set(self, item, cell, properties):
+        self._cells.add(cell)
+        self._cache[id(item), cell] = item, self.version, properties
+
+    def add(self, item):
+        # Values are computed when the item is rendered.
+        pass
+
+    def discard(self, item):
+        for cell in self._cells:
+            self._cache.pop((id(item), cell))
+
+    def invalidate_all(self):
+        self.version += 1
+
+    def clear(self):
+        self._cache.clear()
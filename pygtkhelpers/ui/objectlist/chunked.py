@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+"""
+    pygtkhelpers.ui.objectlist.chunked
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Read-only tables of tabular data stored on disk, read in chunks of rows
+    as they are displayed.
+
+    A chunk reader implements ``len(reader)``, ``reader.columns`` (the column
+    names) and ``reader.read(start, stop)``, returning a `pandas.DataFrame`
+    of the rows in ``[start, stop)``.  Readers may suggest a chunk size with a
+    ``chunk_size`` attribute.
+
+    :copyright: 2005-2008 by pygtkhelpers Authors
+    :license: LGPL 2 or later (see README/COPYING/LICENSE)
+"""
+from collections import OrderedDict, namedtuple
+import threading
+
+import numpy as np
+
+from pygtkhelpers.gthreads import AsyncTask
+from .virtual import IndexedListModel
+
+#: Number of rows read at once, if the reader does not suggest a chunk size.
+DEFAULT_CHUNK_SIZE = 10000
+
+
+class NpyChunkReader(object):
+    """Chunk reader for a ``.npy`` file of a structured or 2-D array.
+
+    The file is memory-mapped, so only the rows read are loaded.
+
+    :param path: Path of the ``.npy`` file
+    """
+    def __init__(self, path):
+        self.array = np.load(path, mmap_mode='r')
+        if self.array.dtype.names is not None:
+            self.columns = list(self.array.dtype.names)
+        else:
+            self.columns = ['column%d' % i for i in
+                            xrange(self.array.shape[1])]
+
+    def __len__(self):
+        return len(self.array)
+
+    def read(self, start, stop):
+        import pandas as pd
+
+        rows = np.array(self.array[start:stop])
+        if rows.dtype.names is not None:
+            return pd.DataFrame.from_records(rows, columns=self.columns)
+        return pd.DataFrame(rows, columns=self.columns)
+
+
+class HDFChunkReader(object):
+    """Chunk reader for a table (stored in ``table`` format) of an HDF5 file.
+
+    :param path: Path of the HDF5 file
+    :param key: Key of the table in the file
+    """
+    def __init__(self, path, key):
+        import pandas as pd
+
+        self.store = pd.HDFStore(path, mode='r')
+        self.key = key
+        self._length = self.store.get_storer(key).nrows
+        self.columns = list(self.store.select(key, start=0, stop=1).columns)
+
+    def __len__(self):
+        return self._length
+
+    def read(self, start, stop):
+        return self.store.select(self.key, start=start, stop=stop)
+
+
+class ParquetChunkReader(object):
+    """Chunk reader for a Parquet file, reading whole row groups.
+
+    The suggested chunk size is the size of the first row group.
+
+    :param path: Path of the Parquet file
+    """
+    def __init__(self, path):
+        import pyarrow.parquet as pq
+
+        self.file = pq.ParquetFile(path)
+        metadata = self.file.metadata
+        sizes = [metadata.row_group(i).num_rows
+                 for i in xrange(metadata.num_row_groups)]
+        # First row of each row group, and the number of rows.
+        self._starts = np.cumsum([0] + sizes)
+        self.columns = list(self.file.schema.names)
+        self.chunk_size = sizes[0] if sizes else DEFAULT_CHUNK_SIZE
+
+    def __len__(self):
+        return int(self._starts[-1])
+
+    def read(self, start, stop):
+        import pandas as pd
+
+        first = np.searchsorted(self._starts, start, 'right') - 1
+        last = np.searchsorted(self._starts, stop, 'left')
+        frames = [self.file.read_row_group(i).to_pandas()
+                  for i in xrange(first, last)]
+        frame = frames[0] if len(frames) == 1 else \
+            pd.concat(frames, ignore_index=True)
+        offset = start - self._starts[first]
+        return frame.iloc[offset:offset + stop - start]
+
+
+class ChunkedTable(object):
+    """Data source reading the rows of a chunk reader on demand.
+
+    Rows are read in chunks of `chunk_size` rows, and the values of the
+    `cache_size` chunks used last are kept.  When a chunk is first used, the
+    chunks before and after it are read in a worker thread, so scrolling
+    does not wait for the reader.
+
+    Items are named tuples of the values of a row (fields of column names
+    that are not valid identifiers are renamed).  The table may be shown by a
+    :class:`VirtualObjectList`, or by a :class:`ChunkedTableModel`.
+
+    :param reader: The chunk reader
+    :param chunk_size: Number of rows read at once, defaults to the size
+                       suggested by the reader, or :data:`DEFAULT_CHUNK_SIZE`.
+    :param cache_size: Maximum number of chunks to keep
+    :param prefetch: Whether to read the neighbouring chunks in a thread
+
+    .. versionadded:: X.X.X
+    """
+    def __init__(self, reader, chunk_size=None, cache_size=8, prefetch=True):
+        self.reader = reader
+        self.chunk_size = chunk_size or getattr(reader, 'chunk_size',
+                                                DEFAULT_CHUNK_SIZE)
+        self.cache_size = cache_size
+        self.prefetch = prefetch
+        self.row_type = namedtuple('Row', reader.columns, rename=True)
+        self._length = len(reader)
+        # chunk -> list of the values of each column, least recently used
+        # first.
+        self._chunks = OrderedDict()
+        self._prefetching = set()
+        self._last_chunk = None
+        # Readers (e.g., PyTables) are not safe to use from several threads.
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._length
+
+    def _read_chunk(self, chunk):
+        start = chunk * self.chunk_size
+        with self._lock:
+            frame = self.reader.read(start, min(start + self.chunk_size,
+                                                self._length))
+        # `tolist()` converts the values to Python types in a single pass.
+        return [frame.iloc[:, i].values.tolist()
+                for i in xrange(frame.shape[1])]
+
+    def _add_chunk(self, chunk, columns):
+        self._chunks[chunk] = columns
+        while len(self._chunks) > self.cache_size:
+            self._chunks.popitem(last=False)
+
+    def chunk(self, chunk):
+        """The values of each column of a chunk
+
+        :param chunk: Index of the chunk
+        """
+        columns = self._chunks.pop(chunk, None)
+        if columns is None:
+            columns = self._read_chunk(chunk)
+        self._add_chunk(chunk, columns)
+        if self.prefetch and chunk != self._last_chunk:
+            self._prefetch_around(chunk)
+        self._last_chunk = chunk
+        return columns
+
+    def _prefetch_around(self, chunk):
+        for neighbour in (chunk + 1, chunk - 1):
+            if neighbour < 0 or neighbour * self.chunk_size >= self._length \
+                    or neighbour in self._chunks \
+                    or neighbour in self._prefetching:
+                continue
+            self._prefetching.add(neighbour)
+            AsyncTask(self._prefetch_work,
+                      self._on_prefetched).start(neighbour)
+
+    def _prefetch_work(self, chunk):
+        return chunk, self._read_chunk(chunk)
+
+    def _on_prefetched(self, chunk, columns):
+        self._prefetching.discard(chunk)
+        if chunk not in self._chunks:
+            self._add_chunk(chunk, columns)
+
+    def value_at(self, index, column):
+        """The value of a column in a row
+
+        :param index: The row
+        :param column: The position of the column
+        """
+        chunk, offset = divmod(index, self.chunk_size)
+        return self.chunk(chunk)[column][offset]
+
+    def item_at(self, index):
+        chunk, offset = divmod(index, self.chunk_size)
+        return self.row_type._make(column[offset]
+                                   for column in self.chunk(chunk))
+
+
+class ChunkedTableModel(IndexedListModel):
+    """Read-only list model showing the columns of a :class:`ChunkedTable`.
+
+    Model column `i` shows the table column of the same position.
+
+    :param table: The table
+    :param df_py_dtypes: Python type information for the columns of the
+                         table, as returned by `get_py_dtypes` for a chunk.
+
+    .. versionadded:: X.X.X
+    """
+    def __init__(self, table, df_py_dtypes):
+        IndexedListModel.__init__(self)
+        self.table = table
+        self.df_py_dtypes = df_py_dtypes
+        self._column_types = df_py_dtypes.dtype.tolist()
+
+    def row_count(self):
+        return len(self.table)
+
+    def on_get_n_columns(self):
+        return len(self._column_types)
+
+    def on_get_column_type(self, index):
+        return self._column_types[index]
+
+    def on_get_value(self, rowref, column):
+        return self.table.value_at(rowref, column)
@@ -9,9 +9,21 @@
     :license: LGPL 2 or later (see README/COPYING/LICENSE)
 """
 
+from operator import attrgetter
+
 import gtk
 
 
+class _Placeholder(object):
+    def __repr__(self):
+        return '<placeholder>'
+
+#: Item of the placeholder row shown below an ObjectTree item whose children
+#: are not loaded yet.  Placeholder rows are always shown by the filter, and
+#: are kept after the other children when sorting.
+PLACEHOLDER = _Placeholder()
+
+
 class PropertyMapper(object):
 
     def __init__(self, prop, attr=None, format_func=None):
@@ -22,11 +34,19 @@ class PropertyMapper(object):
         self.format_func = format_func
 
     def __call__(self, cell, obj, renderer):
+        renderer.set_property(self.prop, self.value(cell, obj))
+
+    def value(self, cell, obj):
         attr = self.attr or cell.attr
         value = obj if attr is None else getattr(obj, attr)
         if self.format_func:
             value = self.format_func(value)
-        renderer.set_property(self.prop, value)
+        return value
+
+    def specs(self, cell):
+        """The (property, attribute, format function) triples of the mapper
+        """
+        return [(self.prop, self.attr or cell.attr, self.format_func)]
 
 
 class CellMapper(object):
@@ -45,6 +65,52 @@ class CellMapper(object):
         for mapper in self.mappers:
             mapper(cell, obj, renderer)
 
+    def specs(self, cell):
+        return [mapper.specs(cell)[0] for mapper in self.mappers]
+
+
+def compile_mappers(specs):
+    """Compile mapper specs into a function computing the property values
+    of an object
+
+    :param specs: A list of (property, attribute, format function) triples,
+                  where an attribute of `None` maps the object itself
+    :returns: A function returning a dict of property values for an object,
+              to be set with a single ``renderer.set_properties(**values)``
+    """
+    if len(specs) == 1:
+        prop, attr, format_func = specs[0]
+        if attr is None:
+            get = None
+        else:
+            get = attrgetter(attr)
+        if get is None and format_func is None:
+            return lambda obj: {prop: obj}
+        elif get is None:
+            return lambda obj: {prop: format_func(obj)}
+        elif format_func is None:
+            return lambda obj: {prop: get(obj)}
+        return lambda obj: {prop: format_func(get(obj))}
+
+    props = [prop for prop, attr, format_func in specs]
+    attrs = [attr for prop, attr, format_func in specs]
+    formatters = [(i, format_func)
+                  for i, (prop, attr, format_func) in enumerate(specs)
+                  if format_func is not None]
+    if None in attrs:
+        def get(obj):
+            return [obj if attr is None else getattr(obj, attr)
+                    for attr in attrs]
+    else:
+        get = attrgetter(*attrs)
+
+    def values(obj):
+        row = list(get(obj))
+        for i, format_func in formatters:
+            row[i] = format_func(row[i])
+        return dict(zip(props, row))
+    return values
+
 
 class Cell(object):
     def __init__(self, attr, type=str, **kw):
@@ -78,6 +144,9 @@ class Cell(object):
         self.mappers = kw.get('mappers', [])
         self.mapped = kw.get('mapped', {})
 
+        # Compiled by compile(), see create_renderer()
+        self._values = None
+
         # XXX: cellmapper needs to die
         if self.mapped:
             self.mappers.append(CellMapper(self.mapped))
@@ -87,12 +156,50 @@ class Cell(object):
                                                format_func=self.format_data))
 
     def render(self, object, cell):
+        if self._values is not None:
+            cell.set_properties(**self._values(object))
+            return
         for mapper in self.mappers:
             mapper(self, object, cell)
 
-    def cell_data_func(self, column, cell, model, iter):
+    def compile(self):
+        """Compile the mappers into a single function computing all the
+        property values of an object, so that rendering makes one
+        ``set_properties`` call.
+
+        Cells with mappers other than :class:`PropertyMapper` and
+        :class:`CellMapper` are rendered by calling each mapper.
+
+        .. versionadded:: X.X.X
+        """
+        specs = []
+        for mapper in self.mappers:
+            if not hasattr(mapper, 'specs'):
+                self._values = None
+                return
+            specs.extend(mapper.specs(self))
+        self._values = compile_mappers(specs) if specs else None
+
+    def cell_data_func(self, column, cell, model, iter, objectlist=None):
         obj = model.get_value(iter, 0)
-        self.render(obj, cell)
+        if obj is None or obj is PLACEHOLDER:
+            # Row being inserted, or placeholder of children that are not
+            # loaded yet.
+            cell.set_property('visible', False)
+            cell.set_data('pygtkhelpers::hidden', True)
+            return
+        elif cell.get_data('pygtkhelpers::hidden'):
+            cell.set_property('visible', True)
+            cell.set_data('pygtkhelpers::hidden', False)
+        cache = getattr(objectlist, 'render_cache', None)
+        if cache is None or self._values is None:
+            self.render(obj, cell)
+            return
+        values = cache.get(obj, self)
+        if values is None:
+            values = self._values(obj)
+            cache.set(obj, self, values)
+        cell.set_properties(**values)
 
     def format_data(self, data):
         if self.format:
@@ -117,6 +224,7 @@ class Cell(object):
         else:
             cell = CellRendererText(self, objectlist)
         cell.set_data('pygtkhelpers::cell', self)
+        self.compile()
         for prop, value in self.cell_props.items():
             cell.set_property(prop, value)
         return cell
@@ -163,6 +271,8 @@ class Column(object):
     :param sort_func: The function to sort this column by
     :param searchable: Whether this field is searchable
     :param search_key: The key used to search this column
+    :param search_index: Whether to search this column through a search
+                         index, see :meth:`ObjectList.find_all`
     :param expander: Whether the expander should be shown before this column
     :param resizable: Whether the user can resize the column
     :param cells: A list of Cell instances to display in this colum
@@ -194,6 +304,7 @@ class Column(object):
         self._init_tooltips(**kwargs)
         self.searchable = kwargs.pop('searchable', False)
         self.search_key = kwargs.pop('search_key', None)
+        self.search_index = kwargs.pop('search_index', False)
         if 'cells' in kwargs:
             self.cells = kwargs['cells']
         else:
@@ -219,7 +330,8 @@ class Column(object):
             view_cell.set_data('pygtkhelpers::column', self)
             # XXX: better control over packing
             col.pack_start(view_cell)
-            col.set_cell_data_func(view_cell, cell.cell_data_func)
+            col.set_cell_data_func(view_cell, cell.cell_data_func,
+                                   objectlist)
         col.set_reorderable(True)
         col.set_sort_indicator(False)
         col.set_sort_order(gtk.SORT_DESCENDING)
@@ -227,6 +339,8 @@ class Column(object):
             idx = objectlist.columns.index(self)
             sort_func = self._default_sort_func
             objectlist.model_sort.set_sort_func(idx, sort_func, objectlist)
+            # Header clicks sort the view only, comparing the keys cached
+            # by the objectlist (see _default_sort_func()).
             col.set_sort_column_id(idx)
         if objectlist and objectlist.searchable and self.searchable:
             self.search_by(objectlist)
@@ -247,7 +361,20 @@ class Column(object):
 
         :param objectlist: An ObjectList or ObjectTree
         """
-        objectlist.set_search_equal_func(self._search_equal_func)
+        if self.search_index:
+            objectlist.set_search_equal_func(
+                objectlist._indexed_search_func,
+                objectlist._search_index_for(self))
+        else:
+            objectlist.set_search_equal_func(self._search_equal_func)
+
+    def search_text_for(self, obj):
+        """The value of an object this column is searched by
+        """
+        val = getattr(obj, self.attr)
+        if self.search_key is not None:
+            val = self.search_key(val)
+        return val
 
     def render_tooltip(self, tooltip, obj):
         """Render the tooltip for this column for an object
@@ -265,20 +392,26 @@ class Column(object):
             setter(val)
         return True
 
+    def sort_key_for(self, obj):
+        """The value of an object this column sorts by
+        """
+        value = getattr(obj, self.attr, None)
+        if self.sort_key:
+            value = self.sort_key(value)
+        return value
+
     def _default_sort_func(self, model, iter1, iter2, objectlist):
         assert model is objectlist.model_filter  # the filtermodel gets sorted
-        attr1 = getattr(model[iter1][0], self.attr, None)
-        attr2 = getattr(model[iter2][0], self.attr, None)
-        if self.sort_key:
-            attr1 = self.sort_key(attr1)
-            attr1 = self.sort_key(attr2)
-        return self.sort_func(attr1, attr2)
+        # Keys are computed once per item and cached by the objectlist.
+        keys = objectlist._sort_keys_for(self)
+        item1 = model.get_value(iter1, 0)
+        item2 = model.get_value(iter2, 0)
+        if item1 is PLACEHOLDER or item2 is PLACEHOLDER:
+            return cmp(item1 is PLACEHOLDER, item2 is PLACEHOLDER)
+        return self.sort_func(keys.get(item1), keys.get(item2))
 
     def _search_equal_func(self, model, column, key, iter):
-        obj = model[iter][0]
-        val = getattr(obj, self.attr)
-        if self.search_key is not None:
-            val = self.search_key(val)
+        val = self.search_text_for(model[iter][0])
         # return False for success!
         return not (key.lower() in str(val).lower())
 
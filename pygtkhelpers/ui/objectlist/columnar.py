@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+"""
+    pygtkhelpers.ui.objectlist.columnar
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Columnar storage of the field values of `CombinedFields` rows.
+
+    :copyright: 2005-2008 by pygtkhelpers Authors
+    :license: LGPL 2 or later (see README/COPYING/LICENSE)
+"""
+import copy
+
+import numpy as np
+
+#: Array types of fields whose default value has one of these types (fields
+#: with other values, or without a default, are stored in object arrays).
+COLUMN_DTYPES = {bool: np.bool_, int: np.int64, float: np.float64}
+# Array type -> type of the values kept in arrays of that type.
+_COLUMN_TYPES = dict((np.dtype(dtype), type_)
+                     for type_, dtype in COLUMN_DTYPES.iteritems())
+
+
+class ColumnarStore(object):
+    '''
+    Field values of the rows of a `CombinedFields`, with one array per
+    mangled field name.
+
+    Each row owns a slot (a position in every array) for as long as the row
+    exists.  Fields whose default is a `bool`, `int` or `float` are stored
+    in arrays of that type; the array of a field is converted to an object
+    array if a value of another type (e.g., `None`, or a `bool` in an `int`
+    array) is stored, so values are read back with the type they were
+    stored with.  Values of
+    names that are not fields of the forms are stored in object arrays.
+
+    The store does not reference the `CombinedFields`, so rows (which
+    release their slot when they are deleted) are never part of a reference
+    cycle.
+
+    Args:
+
+        combined_fields (CombinedFields)
+        capacity (int) : Initial number of slots.
+    '''
+    def __init__(self, combined_fields, capacity=64):
+        # Shared with `combined_fields`, which adds names resolved by prefix.
+        self._fields = combined_fields._mangled_fields
+        self._prefixes = [(combined_fields.field_set_prefix % uuid_code,
+                           form_name) for form_name, uuid_code in
+                          combined_fields.uuid_mapping.iteritems()]
+        self._capacity = capacity
+        self._n_slots = 0
+        self._free = []
+        self._defaults = {}
+        self.columns = {}
+        for form_name, form in combined_fields._forms.iteritems():
+            prefix = combined_fields.field_set_prefix % \
+                combined_fields.uuid_mapping[form_name]
+            for field_name, value in form.from_defaults().iteritems():
+                name = prefix + field_name
+                self._defaults[name] = value.value
+                dtype = COLUMN_DTYPES.get(type(value.value), object)
+                self.columns[name] = self._new_column(dtype, value.value,
+                                                      capacity)
+
+    @staticmethod
+    def _new_column(dtype, default, size):
+        column = np.empty(size, dtype=dtype)
+        column.fill(default)
+        return column
+
+    def field_for_name(self, name):
+        '''
+        Return the (form name, field name) of a mangled field name, or `None`.
+        '''
+        field = self._fields.get(name)
+        if field is None:
+            for prefix, form_name in self._prefixes:
+                if name.startswith(prefix):
+                    field = self._fields[name] = (form_name,
+                                                  name[len(prefix):])
+                    break
+        return field
+
+    def names(self, form_name):
+        '''
+        Mangled names of the values stored for the fields of a form.
+        '''
+        return [name for name in self.columns
+                if self._fields.get(name, (None, ))[0] == form_name]
+
+    def allocate(self, values=None):
+        '''
+        Return a slot holding default values, then `values` (dictionary of
+        values by mangled name).
+        '''
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._n_slots == self._capacity:
+                self._grow()
+            slot = self._n_slots
+            self._n_slots += 1
+        if values:
+            for name, value in values.iteritems():
+                self.set(name, slot, value)
+        return slot
+
+    def _grow(self):
+        capacity = 2 * self._capacity
+        for name, column in self.columns.iteritems():
+            new_column = self._new_column(column.dtype,
+                                          self._defaults.get(name), capacity)
+            new_column[:self._capacity] = column
+            self.columns[name] = new_column
+        self._capacity = capacity
+
+    def release(self, slot):
+        '''
+        Reset the values of a slot to the defaults, and reuse it for a new row.
+        '''
+        for name, column in self.columns.iteritems():
+            column[slot] = self._defaults.get(name)
+        self._free.append(slot)
+
+    def _object_column(self, name):
+        column = self.columns.get(name)
+        if column is None:
+            column = self._new_column(object, None, self._capacity)
+        elif column.dtype != object:
+            column = column.astype(object)
+        self.columns[name] = column
+        return column
+
+    def get(self, name, slot):
+        column = self.columns.get(name)
+        if column is None:
+            return None
+        value = column[slot]
+        if isinstance(value, np.generic):
+            value = value.item()
+        return value
+
+    def set(self, name, slot, value):
+        column = self.columns.get(name)
+        if column is None or type(value) is not \
+                _COLUMN_TYPES.get(column.dtype):
+            # Storing the value in the typed array would convert it (e.g.,
+            # truncate a `float` in an `int` array).
+            column = self._object_column(name)
+        column[slot] = value
+
+    def copy(self, slot, memo=None):
+        '''
+        Return a new slot holding the values of `slot`.
+
+        Values in object arrays are deep copied if `memo` (the memo dictionary
+        of `copy.deepcopy`) is given.
+        '''
+        new_slot = self.allocate()
+        for column in self.columns.itervalues():
+            value = column[slot]
+            if memo is not None and column.dtype == object:
+                value = copy.deepcopy(value, memo)
+            column[new_slot] = value
+        return new_slot
+
+    def get_many(self, name, slots):
+        '''
+        Return an array of the values of `name` in `slots`.
+        '''
+        column = self.columns.get(name)
+        if column is None:
+            column = self._object_column(name)
+        return column[slots]
+
+    def set_many(self, name, slots, values):
+        '''
+        Set the values of `name` in `slots` from a sequence or array.
+        '''
+        values = np.asarray(values)
+        column = self.columns.get(name)
+        if column is None or values.dtype != column.dtype:
+            column = self._object_column(name)
+        column[slots] = values
+
+
+class ColumnarRowFields(object):
+    '''
+    View of the values of the fields of one form in a `ColumnarRow`, with
+    the interface of `RowFields`.
+    '''
+    def __init__(self, row, form_name, prefix):
+        self.__dict__.update(_row=row, _form_name=form_name, _prefix=prefix)
+
+    def __getattr__(self, name):
+        return self._row._store.get(self._prefix + name, self._row._slot)
+
+    def __setattr__(self, name, value):
+        store = self._row._store
+        store.field_for_name(self._prefix + name)
+        store.set(self._prefix + name, self._row._slot, value)
+
+    @property
+    def attrs(self):
+        store = self._row._store
+        return dict((name[len(self._prefix):], store.get(name,
+                                                         self._row._slot))
+                    for name in store.names(self._form_name))
+
+
+class ColumnarRow(object):
+    '''
+    Row of a `CombinedFields` created with `storage='columnar'`.
+
+    The row only holds its slot in the `ColumnarStore` of the list, and
+    provides the attribute access (by mangled field name) and the methods of
+    `CombinedRow`.
+
+    Args:
+
+        store (ColumnarStore) : The `store` of the `CombinedFields`.
+        attributes (dict) : Optional mapping of form names to `RowFields` (or
+            dictionaries) of initial values.
+    '''
+    __slots__ = ('_store', '_slot')
+
+    def __init__(self, store, attributes=None):
+        values = {}
+        if attributes:
+            prefixes = dict((form_name, prefix)
+                            for prefix, form_name in store._prefixes)
+            for form_name, row_fields in attributes.iteritems():
+                attrs = getattr(row_fields, 'attrs', row_fields)
+                for attr, value in attrs.iteritems():
+                    values[prefixes[form_name] + attr] = value
+        self._store = store
+        self._slot = store.allocate(values)
+
+    def __copy__(self):
+        row = ColumnarRow.__new__(ColumnarRow)
+        row._store = self._store
+        row._slot = self._store.copy(self._slot)
+        return row
+
+    def __deepcopy__(self, memo):
+        row = ColumnarRow.__new__(ColumnarRow)
+        row._store = self._store
+        row._slot = self._store.copy(self._slot, memo)
+        return row
+
+    def __del__(self):
+        slot = getattr(self, '_slot', None)
+        if slot is not None:
+            self._store.release(slot)
+
+    def _prefix(self, form_name):
+        for prefix, form_name_i in self._store._prefixes:
+            if form_name_i == form_name:
+                return prefix
+        raise KeyError(form_name)
+
+    def set_row_fields_attr(self, form_name, attr, value):
+        self._store.set(self._prefix(form_name) + attr, self._slot, value)
+
+    def get_row_fields(self, form_name):
+        return ColumnarRowFields(self, form_name, self._prefix(form_name))
+
+    @property
+    def attributes(self):
+        return dict((form_name, ColumnarRowFields(self, form_name, prefix))
+                    for prefix, form_name in self._store._prefixes)
+
+    def set_row_id(self, row_id):
+        if row_id is not None:
+            self.set_row_fields_attr('__DefaultFields', 'id', row_id)
+
+    def __getattr__(self, name):
+        if name in ColumnarRow.__slots__ or \
+                self._store.field_for_name(name) is None:
+            raise AttributeError(name)
+        return self._store.get(name, self._slot)
+
+    def __setattr__(self, name, value):
+        if name in ColumnarRow.__slots__:
+            object.__setattr__(self, name, value)
+        elif self._store.field_for_name(name) is not None:
+            self._store.set(name, self._slot, value)
+        else:
+            raise AttributeError(name)
+
+    def __str__(self):
+        return '<ColumnarRow attributes=%s>' % [
+            (k, v.attrs) for k, v in self.attributes.iteritems()]
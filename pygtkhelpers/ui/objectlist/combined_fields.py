@@ -3,12 +3,14 @@ import re
 import logging
 
 import gtk
+import numpy as np
 from flatland import Form, Integer
 
 from ...utils import gsignal
 from ..extra_widgets import get_type_from_schema
 from ..form_view_dialog import FormViewDialog
 from .uuid_minimal import uuid4
+from .columnar import ColumnarStore, ColumnarRow
 from .column import Column
 from .view import ObjectList
 
@@ -103,6 +105,14 @@ class CombinedFields(ObjectList):
      (u'_e4467fe0bd__another_int_field', u'Another int field'),
      (u'_196ff80637__my_string_field', u'My string field'),
      (u'_196ff80637__my_int_field', u'My int field')]
+
+    Rows are created with `new_row`.  With `storage='columnar'`, the field
+    values of all rows are stored in one array per field (see
+    `ColumnarStore`), and may be read and set for all rows at once with
+    `get_column_values` and `set_column_values`.
+
+    .. versionchanged:: X.X.X
+        Add `storage` argument.
     '''
     field_set_prefix = '_%s__'
 
@@ -116,7 +126,10 @@ class CombinedFields(ObjectList):
         return dict([(k, v) for k, v in self._forms.iteritems()
                      if k != '__DefaultFields'])
 
-    def __init__(self, forms, enabled_attrs, show_ids=True, **kwargs):
+    def __init__(self, forms, enabled_attrs, show_ids=True, storage='rows',
+                 **kwargs):
+        if storage not in ('rows', 'columnar'):
+            raise ValueError('Unknown storage: %s' % storage)
         self.first_selected = True
         self._forms = forms.copy()
         row_id_properties = dict(editable=False)
@@ -130,6 +143,14 @@ class CombinedFields(ObjectList):
                                   for name in self._forms])
         self.uuid_reverse_mapping = dict([(v, k) for k, v in
                                           self.uuid_mapping.items()])
+        # Mangled field name -> (form name, field name), for `CombinedRow`
+        # attribute access.
+        self._mangled_fields = {}
+        for form_name, form in self._forms.iteritems():
+            prefix = self.field_set_prefix % self.uuid_mapping[form_name]
+            for field in form.field_schema:
+                self._mangled_fields[prefix + field.name] = (form_name,
+                                                             field.name)
         self._columns = []
         self._full_field_to_field_def = {}
         if not enabled_attrs:
@@ -176,6 +197,10 @@ class CombinedFields(ObjectList):
                     d['step'] = field_name.properties.get('step', 0.1)
                 self._columns.append(Column(**d))
                 self._full_field_to_field_def[name] = field_name
+        if storage == 'columnar':
+            self.store = ColumnarStore(self)
+        else:
+            self.store = None
         super(CombinedFields, self).__init__(self._columns, **kwargs)
         s = self.get_selection()
         # Enable multiple row selection
@@ -184,9 +209,71 @@ class CombinedFields(ObjectList):
         self.connect('item-right-clicked', self._on_right_clicked)
         self.enabled_fields_by_form_name = enabled_attrs
 
-        self.connect('item-added', lambda x, y: self.reset_row_ids())
-        self.connect('item-inserted', lambda x, y, z: self.reset_row_ids())
-        self.connect('item-removed', lambda x, y: self.reset_row_ids())
+        # First position whose row id must be renumbered at the end of a
+        # batch or of `set_items` (`None` outside of them).
+        self._row_ids_from = None
+        self.connect('item-added', self._on_item_added)
+        self.connect('item-inserted', self._on_item_moved_rows)
+        self.connect('item-removed', self._on_item_moved_rows)
+        self.connect('batch-finished', self._on_batch_finished)
+
+    def new_row(self, attributes=None):
+        '''
+        Return a new row (not added to the list), using the storage of the
+        list.
+
+        Args:
+
+            attributes (dict) : Optional mapping of form names to `RowFields`
+                of initial values.
+
+        Returns:
+
+            (CombinedRow or ColumnarRow)
+        '''
+        if self.store is not None:
+            return ColumnarRow(self.store, attributes)
+        return CombinedRow(self, attributes)
+
+    def _slots(self, rows):
+        if self.store is None:
+            raise ValueError('Column values are only available with '
+                             'columnar storage.')
+        return np.array([row._slot for row in rows], dtype=int)
+
+    def get_column_values(self, attr, rows=None):
+        '''
+        Return the values of a field for several rows, with columnar storage.
+
+        Args:
+
+            attr (str) : Mangled field name (i.e., the `attr` of a column).
+            rows (list) : Rows, all the rows of the list (in list order) by
+                default.
+
+        Returns:
+
+            (numpy.ndarray)
+        '''
+        rows = list(self) if rows is None else rows
+        return self.store.get_many(attr, self._slots(rows))
+
+    def set_column_values(self, attr, values, rows=None):
+        '''
+        Set the values of a field for several rows at once, with columnar
+        storage, and update the rows.
+
+        Args:
+
+            attr (str) : Mangled field name (i.e., the `attr` of a column).
+            values : Value, or sequence of values (one per row).
+            rows (list) : Rows, all the rows of the list (in list order) by
+                default.
+        '''
+        rows = list(self) if rows is None else list(rows)
+        self.store.field_for_name(attr)
+        self.store.set_many(attr, self._slots(rows), values)
+        self.update_many(rows)
 
     def _set_rows_attr(self, row_ids, column_title, value, prompt=False):
         title_map = dict([(c.title, c.attr) for c in self.columns])
@@ -250,7 +337,7 @@ class CombinedFields(ObjectList):
             menu_items += [('Deselect all rows', self._deselect_all),
                            ('Invert row selection', invert_rows)]
 
-        item_id = [r for r in self].index(item)
+        item_id = self.index(item)
         if item_id not in row_ids:
             logging.debug('[ProtocolGridController] _on_right_clicked(): '
                           'clicked item is not selected')
@@ -319,14 +406,113 @@ class CombinedFields(ObjectList):
         self.emit('rows-changed', row_ids, rows, attr)
 
     def _on_item_changed(self, widget, row_data, attr, value, **kwargs):
-        row_id = [r for r in self].index(row_data)
+        row_id = self.index(row_data)
         logging.debug('[CombinedFields] _on_item_changed(): name=%s value=%s',
                       attr, value)
         self.emit('row-changed', row_id, row_data, attr, value)
 
+    def _field_for_name(self, name):
+        '''
+        Return the (form name, field name) of a mangled field name, or `None`
+        if the name does not start with the prefix of a form.
+        '''
+        field = self._mangled_fields.get(name)
+        if field is None:
+            # Not a field of the form schema, but may still be a form value.
+            for form_name, uuid_code in self.uuid_mapping.iteritems():
+                field_set_prefix = self.field_set_prefix % uuid_code
+                if name.startswith(field_set_prefix):
+                    field = (form_name, name[len(field_set_prefix):])
+                    self._mangled_fields[name] = field
+                    break
+        return field
+
+    def _on_item_added(self, widget, combined_row):
+        # Signals queued by a batch may name rows removed later in the batch.
+        if combined_row not in self:
+            return
+        position = self.index(combined_row)
+        if self._row_ids_from is not None:
+            self._row_ids_from = min(self._row_ids_from, position)
+        else:
+            # Other rows do not move, so only the appended row gets its id.
+            row_fields = combined_row.get_row_fields('__DefaultFields')
+            if row_fields.id != position + 1:
+                row_fields.id = position + 1
+                self.update(combined_row)
+
+    def _on_item_moved_rows(self, widget, combined_row, position):
+        # The rows after an inserted or removed row move, so their ids are
+        # renumbered.
+        if self._row_ids_from is not None:
+            self._row_ids_from = min(self._row_ids_from, position)
+        else:
+            self._renumber_rows(position)
+
+    def _end_batch(self):
+        # Renumber once, from the first position changed by the batch (or
+        # from the start if the positions are not reported).
+        self._row_ids_from = len(self) if self._batch['item_signals'] else 0
+        try:
+            super(CombinedFields, self)._end_batch()
+        finally:
+            self._row_ids_from = None
+
+    def _on_batch_finished(self, widget, added, removed):
+        # Connected before any other handler, so the ids are up to date when
+        # other handlers run.
+        position, self._row_ids_from = self._row_ids_from, None
+        if added or removed:
+            self._renumber_rows(position)
+
+    def set_items(self, new_items, key=None):
+        old_items = [row[0] for row in self.model]
+        # Already set if called by a handler of the signals queued by a batch.
+        pending = self._row_ids_from is not None
+        if not pending:
+            self._row_ids_from = len(self)
+        try:
+            super(CombinedFields, self).set_items(new_items, key)
+        finally:
+            # Rows may also be reordered or replaced, without signals, so
+            # renumber from the first row that differs.
+            position = len(self)
+            for i, row in enumerate(self.model):
+                if i >= len(old_items) or row[0] is not old_items[i]:
+                    position = i
+                    break
+            position = min(position, self._row_ids_from)
+            if pending:
+                self._row_ids_from = position
+            else:
+                self._row_ids_from = None
+        if not pending:
+            self._renumber_rows(position)
+
+    set_items.__doc__ = ObjectList.set_items.__doc__
+
+    def _renumber_rows(self, position):
+        '''
+        Set the row ids from `position` onward, and update the rows whose id
+        changed.
+        '''
+        model = self.model
+        changed = []
+        row_id = position + 1
+        giter = model.iter_nth_child(None, position)
+        while giter is not None:
+            row_fields = model.get_value(giter, 0)\
+                .get_row_fields('__DefaultFields')
+            if row_fields.id != row_id:
+                row_fields.id = row_id
+                changed.append(model.get_value(giter, 0))
+            giter = model.iter_next(giter)
+            row_id += 1
+        if changed:
+            self.update_many(changed)
+
     def reset_row_ids(self):
-        for i, combined_row in enumerate(self):
-            combined_row.set_row_fields_attr('__DefaultFields', 'id', i + 1)
+        self._renumber_rows(0)
 
 
 class CombinedRow(object):
@@ -420,25 +606,20 @@ class CombinedRow(object):
 
     def __getattr__(self, name):
         if name not in ['attributes', 'combined_fields']:
-            for form_name, uuid_code in self.combined_fields.uuid_mapping\
-                    .iteritems():
-                field_set_prefix = self.field_set_prefix % uuid_code
-                if name.startswith(field_set_prefix):
-                    return getattr(self.attributes[form_name],
-                                   name[len(field_set_prefix):])
+            field = self.combined_fields._field_for_name(name)
+            if field is not None:
+                form_name, field_name = field
+                return getattr(self.attributes[form_name], field_name)
         return object.__getattribute__(self, name)
 
     def __setattr__(self, name, value):
         if name not in ['attributes', 'combined_fields']:
-            for form_name, uuid_code in self.combined_fields.uuid_mapping\
-                    .iteritems():
-                field_set_prefix = self.field_set_prefix % uuid_code
-                if name.startswith(field_set_prefix):
-                    # Update value
-                    setattr(self.attributes[form_name],
-                            name[len(field_set_prefix):], value)
-                    logging.debug('[CombinedRow] setattr %s=%s', name, value)
-                    break
+            field = self.combined_fields._field_for_name(name)
+            if field is not None:
+                # Update value
+                form_name, field_name = field
+                setattr(self.attributes[form_name], field_name, value)
+                logging.debug('[CombinedRow] setattr %s=%s', name, value)
         else:
             self.__dict__[name] = value
 
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""
+    pygtkhelpers.ui.objectlist.dataframe
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tree model showing the contents of a `pandas.DataFrame`.
+
+    :copyright: 2005-2008 by pygtkhelpers Authors
+    :license: LGPL 2 or later (see README/COPYING/LICENSE)
+"""
+import numpy as np
+
+from .virtual import IndexedListModel
+
+
+class DataFrameTreeModel(IndexedListModel):
+    """List model reading its cells from the columns of a data frame.
+
+    Cells are read from the NumPy array of each frame column when they are
+    displayed, so the data is not copied into the model.  Values written
+    with :meth:`set_value` are written to the frame.  Changes made to the
+    frame by other code must be announced with :meth:`frame_changed`.
+
+    :param data_frame: The `pandas.DataFrame`
+    :param df_py_dtypes: Python type information for the columns of the
+                         frame, as returned by `get_py_dtypes`.  Model column
+                         `i` shows the frame column of the same position.
+
+    .. versionadded:: X.X.X
+    """
+    def __init__(self, data_frame, df_py_dtypes):
+        IndexedListModel.__init__(self)
+        self.data_frame = data_frame
+        self.df_py_dtypes = df_py_dtypes
+        self._column_types = df_py_dtypes.dtype.tolist()
+        self._arrays = [None] * len(self._column_types)
+        self._n_rows = len(data_frame)
+
+    def row_count(self):
+        return self._n_rows
+
+    def _array(self, column):
+        # Arrays are looked up once, since `DataFrame.__getitem__` is much
+        # slower than indexing an array.
+        array = self._arrays[column]
+        if array is None:
+            array = self._arrays[column] = \
+                self.data_frame.iloc[:, column].values
+        return array
+
+    def column_values(self, column):
+        """The array of values of a model column"""
+        return self._array(column)
+
+    def on_get_n_columns(self):
+        return len(self._column_types)
+
+    def on_get_column_type(self, index):
+        return self._column_types[index]
+
+    def on_get_value(self, rowref, column):
+        value = self._array(column)[rowref]
+        if isinstance(value, np.generic):
+            value = value.item()
+        return value
+
+    def set_value(self, iter, column, value):
+        """Set the value of a cell, in the data frame
+
+        :param iter: The iter of the row
+        :param column: The model column
+        :param value: The new value
+        """
+        row = self.get_user_data(iter)
+        self._array(column)[row] = value
+        self.row_changed((row, ), iter)
+
+    def frame_changed(self, rows=None, columns=None):
+        """Announce changes made to the data frame
+
+        Rows added to or removed from the end of the frame are inserted in
+        or removed from the model.
+
+        :param rows: Positions of the changed rows, or `None` for all rows.
+        :param columns: Names of the changed columns, or `None` for all
+                        columns.  The arrays of these columns are looked up
+                        again, in case the frame replaced them.
+        """
+        if columns is None:
+            self._arrays = [None] * len(self._column_types)
+        else:
+            for i in self.df_py_dtypes.i[list(columns)]:
+                self._arrays[i] = None
+        n_rows = len(self.data_frame)
+        for row in xrange(self._n_rows - 1, n_rows - 1, -1):
+            self._n_rows = row
+            self.row_deleted((row, ))
+        changed = self._n_rows
+        if rows is None:
+            rows = xrange(changed)
+        for row in rows:
+            if row < changed:
+                self.row_changed((row, ), self.get_iter((row, )))
+        for row in xrange(changed, n_rows):
+            self._n_rows = row + 1
+            self.row_inserted((row, ), self.get_iter((row, )))
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""
+    pygtkhelpers.ui.objectlist.search
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Substring search index for the interactive search of object lists.
+
+    :copyright: 2005-2008 by pygtkhelpers Authors
+    :license: LGPL 2 or later (see README/COPYING/LICENSE)
+"""
+
+#: Length of the n-grams indexed.
+GRAM_SIZE = 3
+
+
+def normalize(value):
+    """Lowercased string used to match a value
+    """
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    elif not isinstance(value, str):
+        value = str(value)
+    return value.lower()
+
+
+def _grams(text):
+    return set(text[i:i + GRAM_SIZE]
+               for i in xrange(len(text) - GRAM_SIZE + 1))
+
+
+class SearchIndex(object):
+    """Index of the items containing a (case insensitive) substring.
+
+    The normalized text of each item is computed once, when the item is
+    added.  Queries of at least :data:`GRAM_SIZE` characters only check the
+    items containing every trigram of the query; shorter queries check the
+    normalized texts, without converting any value.
+
+    :param text: Callable returning the value of an item to search.
+    """
+    def __init__(self, text):
+        self.text = text
+        self._items = {}
+        self._texts = {}
+        self._grams = {}
+        self._last = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, item):
+        self.discard(item)
+        text = normalize(self.text(item))
+        item_id = id(item)
+        self._items[item_id] = item
+        self._texts[item_id] = text
+        for gram in _grams(text):
+            self._grams.setdefault(gram, set()).add(item_id)
+        self._last = None
+
+    def discard(self, item):
+        item_id = id(item)
+        text = self._texts.pop(item_id, None)
+        if text is None:
+            return
+        del self._items[item_id]
+        for gram in _grams(text):
+            ids = self._grams[gram]
+            ids.discard(item_id)
+            if not ids:
+                del self._grams[gram]
+        self._last = None
+
+    def clear(self):
+        self._items.clear()
+        self._texts.clear()
+        self._grams.clear()
+        self._last = None
+
+    def matching_ids(self, key):
+        """Ids of the items whose text contains `key`
+
+        The result of the last query is kept until the index changes, since
+        the interactive search checks every row against the same key.
+        """
+        key = normalize(key)
+        if self._last is not None and self._last[0] == key:
+            return self._last[1]
+        texts = self._texts
+        if len(key) < GRAM_SIZE:
+            candidates = texts
+        else:
+            gram_ids = sorted((self._grams.get(gram, ()) for gram in
+                               _grams(key)), key=len)
+            candidates = set(gram_ids[0]).intersection(*gram_ids[1:])
+        ids = frozenset(item_id for item_id in candidates
+                        if key in texts[item_id])
+        self._last = key, ids
+        return ids
+
+    def matches(self, key):
+        """Items whose text contains `key`, in no particular order
+        """
+        return [self._items[item_id] for item_id in self.matching_ids(key)]
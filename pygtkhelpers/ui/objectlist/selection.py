@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+"""
+    pygtkhelpers.ui.objectlist.selection
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Effective selection of object trees.
+
+    :copyright: 2005-2008 by pygtkhelpers Authors
+    :license: LGPL 2 or later (see README/COPYING/LICENSE)
+"""
+
+from .column import PLACEHOLDER
+
+
+class TreeSelectionSet(object):
+    """The items selected in an ObjectTree, including the descendants of
+    selected collapsed items.
+
+    The items implied by each selected row are kept per row.  After the
+    selection changed, only the rows that were selected or unselected are
+    added or removed (the first time the set is read); after the tree
+    structure or the expanded rows changed, the set is recomputed.
+    Membership tests and counts take constant time, and iteration follows
+    the view order.
+
+    :param tree: The ObjectTree
+    """
+    def __init__(self, tree):
+        self.tree = tree
+        # id(item) of each selected row -> items implied by the row
+        self._rows = None
+        self._ids = None
+        self._items = None
+        self._selection_changed = False
+        model = tree.model
+        # The selection handler of the tree is blocked while rows change, so
+        # the set also listens to the selection itself.
+        tree.selection.connect('changed', self.selection_changed)
+        tree.connect('row-expanded', self.invalidate)
+        tree.connect('row-collapsed', self.invalidate)
+        model.connect('row-inserted', self.invalidate)
+        model.connect('row-deleted', self.invalidate)
+        model.connect('rows-reordered', self.invalidate)
+
+    def invalidate(self, *args):
+        """Recompute the set when it is next read."""
+        self._rows = self._ids = self._items = None
+
+    def selection_changed(self, *args):
+        """Update the rows that were selected or unselected when the set is
+        next read."""
+        self._selection_changed = True
+
+    def _selected_rows(self):
+        model, selected_paths = self.tree.selection.get_selected_rows()
+        rows = []
+        for path in selected_paths:
+            item = model[path][0]
+            if item is not PLACEHOLDER:
+                rows.append((path, item))
+        return rows
+
+    def _row_items(self, path, item):
+        if self.tree.row_expanded(path):
+            return [item]
+        return list(self.tree._iter_children(item))
+
+    def _update(self):
+        if self._rows is not None and not self._selection_changed:
+            return
+        self._selection_changed = False
+        selected_rows = self._selected_rows()
+        if self._rows is None:
+            self._rows = {}
+            self._ids = set()
+            removed = ()
+        else:
+            selected_ids = set(id(item) for path, item in selected_rows)
+            removed = [row_id for row_id in self._rows
+                       if row_id not in selected_ids]
+        rows = self._rows
+        for row_id in removed:
+            self._ids.difference_update(id(item) for item in rows.pop(row_id))
+        for path, item in selected_rows:
+            if id(item) not in rows:
+                row_items = rows[id(item)] = self._row_items(path, item)
+                self._ids.update(id(item_i) for item_i in row_items)
+        self._items = [item_i for path, item in selected_rows
+                       for item_i in rows[id(item)]]
+
+    def __contains__(self, item):
+        self._update()
+        return id(item) in self._ids
+
+    def __len__(self):
+        self._update()
+        return len(self._ids)
+
+    def __iter__(self):
+        self._update()
+        return iter(self._items)
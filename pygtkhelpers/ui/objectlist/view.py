@@ -12,10 +12,40 @@
 
 import itertools
 import copy
+import cPickle
+import zlib
+from cStringIO import StringIO
+from contextlib import contextmanager
 
+import gobject
 import gtk
 
+from pygtkhelpers.gthreads import GeneratorTask
 from pygtkhelpers.utils import gsignal
+from .cache import RenderCache, SortKeyCache, VisibilityCache
+from .column import PLACEHOLDER
+from .search import SearchIndex
+from .selection import TreeSelectionSet
+
+
+#: Sort column id that turns sorting off for a `gtk.TreeSortable`
+#: (`GTK_TREE_SORTABLE_UNSORTED_SORT_COLUMN_ID`).
+UNSORTED_SORT_COLUMN_ID = -2
+
+
+def sort_direction(direction):
+    """Return the `gtk.SortType` for a sort direction.
+
+    :param direction: Either `asc` or `desc` (or `+`/`-`, or a
+                      `gtk.SortType`) indicating the direction of sorting
+    :raises AttributeError: If the direction is not recognised.
+    """
+    if direction in ('+', 'asc', gtk.SORT_ASCENDING):
+        return gtk.SORT_ASCENDING
+    elif direction in ('-', 'desc', gtk.SORT_DESCENDING):
+        return gtk.SORT_DESCENDING
+    else:
+        raise AttributeError('unrecognised direction')
 
 
 class ObjectTreeViewBase(gtk.TreeView):
@@ -25,6 +55,14 @@ class ObjectTreeViewBase(gtk.TreeView):
     :param searchable: Whether this view is searchable
     :param sortable: Whether this view is sortable
     :param show_tooltips: Whether this view shows tooltips
+    :param render_cache_size: Number of rendered cells whose property values
+                              are cached (see :meth:`invalidate`), or `None`
+                              to compute them on every redraw
+    :param coalesce_updates: Whether :meth:`update` calls are collected and
+                             applied once, when the main loop is idle
+
+    .. versionchanged:: X.X.X
+        Add the `render_cache_size` and `coalesce_updates` arguments.
     """
 
     gsignal('item-activated', object)
@@ -35,6 +73,10 @@ class ObjectTreeViewBase(gtk.TreeView):
     gsignal('item-middle-clicked', object, gtk.gdk.Event)
     gsignal('item-double-clicked', object, gtk.gdk.Event)
     gsignal('item-added', object)
+    # items-added(list of items)
+    gsignal('items-added', object)
+    # batch-finished(added items, removed items)
+    gsignal('batch-finished', object, object)
     # editing-started(cellrenderer, editable, path, column)
     gsignal('editing-started', object, object, object, object)
     # editing-canceled(cellrenderer, column)
@@ -44,12 +86,28 @@ class ObjectTreeViewBase(gtk.TreeView):
 
     def __init__(self, columns=(), **kwargs):
         gtk.TreeView.__init__(self)
+        self.columns = None
+        # Per-item caches (e.g., sort keys), discarded when an item is updated
+        # or removed.
+        self._caches = {}
+        self._sort_by = None
+        # State of the outermost batch(), see _begin_batch()
+        self._batch_depth = 0
+        self._batch = None
+        self.coalesce_updates = kwargs.pop('coalesce_updates', False)
+        # id(item) -> item, for updates waiting for _flush_updates()
+        self._pending_updates = {}
+        self._flush_source = None
+        render_cache_size = kwargs.pop('render_cache_size', None)
+        if render_cache_size:
+            self.render_cache = self._caches['render'] = \
+                RenderCache(render_cache_size)
+        else:
+            self.render_cache = None
         # XXX: make replacable
         self.model = self.create_model()
         self.model_base = self.model
-        self.model_filter = self.model.filter_new()
-        self.model_sort = gtk.TreeModelSort(self.model_filter)
-        self.model_tree = self.model_sort
+        self._build_model_chain()
         self.set_model(self.model_sort)
         # setup sorting
         self.sortable = kwargs.pop('sortable', True)
@@ -57,7 +115,6 @@ class ObjectTreeViewBase(gtk.TreeView):
         self.set_enable_search(self.searchable)
         if self.searchable:
             self.set_search_column(0)
-        self.columns = None
         self.set_columns(columns)
         # misc initial setup
         self.set_property('has-tooltip', kwargs.pop('show_tooltips', True))
@@ -73,6 +130,193 @@ class ObjectTreeViewBase(gtk.TreeView):
         """
         raise NotImplementedError
 
+    def _build_model_chain(self):
+        """(Re)create the filter and sort models stacked on the base model.
+
+        Sort functions of sortable columns and the visible function (if one
+        was set) are installed on the new models.
+        """
+        self.model_filter = self.model.filter_new()
+        # Only install the filter once a visible function has been set.
+        if 'visible' in self._caches:
+            self.model_filter.set_visible_func(self._internal_visible_func)
+        self.model_sort = gtk.TreeModelSort(self.model_filter)
+        self.model_sort.connect('sort-column-changed',
+                                self._on_sort_column_changed)
+        self.model_tree = self.model_sort
+        if self.columns and self.sortable:
+            for idx, col in enumerate(self.columns):
+                if col.sorted:
+                    self.model_sort.set_sort_func(idx, col._default_sort_func,
+                                                  self)
+
+    def _detach_model(self):
+        """Detach the view, filter and sort models from the base model.
+
+        While detached, changes to the base model do not propagate through
+        the filter and sort models, and the view is not updated.
+
+        :returns: The state to pass to :meth:`_attach_model` to restore the
+                  sort order and selection.
+        """
+        selected = self._hold_selection()
+        view_sort = self.model_sort.get_sort_column_id()
+        base_sort = self.model.get_sort_column_id()
+        self.set_model(None)
+        # Drop the filter and sort models so they stop listening to the base
+        # model.
+        self.model_filter = self.model_sort = self.model_tree = None
+        if base_sort[0] is not None:
+            # Do not keep the base model sorted on every insert.
+            self.model.set_sort_column_id(UNSORTED_SORT_COLUMN_ID,
+                                          gtk.SORT_ASCENDING)
+        return view_sort, base_sort, selected
+
+    def _attach_model(self, state):
+        """Reattach the view to the base model after :meth:`_detach_model`.
+
+        :param state: State returned by :meth:`_detach_model`.
+        """
+        view_sort, base_sort, selected = state
+        if base_sort[0] is not None:
+            self.model.set_sort_column_id(*base_sort)
+        self._build_model_chain()
+        if view_sort[0] is not None:
+            self.model_sort.set_sort_column_id(*view_sort)
+        self.set_model(self.model_sort)
+        self._restore_selection(selected)
+
+    def _hold_selection(self):
+        """Block the selection handler and return the selected items."""
+        self.selection.handler_block(self.selection_connect)
+        model, selected_paths = self.selection.get_selected_rows()
+        return [model[path][0] for path in selected_paths]
+
+    @contextmanager
+    def _rows_changing(self):
+        """Context manager blocking the selection handler while rows are
+        added or removed with the view attached.
+
+        Unlike :meth:`batch`, expanded rows and the scroll position are kept.
+        ``selection-changed`` is emitted at the end if selected items were
+        removed.
+        """
+        if self._batch_depth:
+            yield
+            return
+        selected = self._hold_selection()
+        try:
+            yield
+        finally:
+            self.selection.handler_unblock(self.selection_connect)
+        if any(item not in self for item in selected):
+            self.emit('selection-changed')
+
+    def _restore_selection(self, selected):
+        """Reselect items returned by :meth:`_hold_selection` (if still in the
+        list) and unblock the selection handler.
+        """
+        for item in selected:
+            if item in self:
+                self.selection.select_iter(self._sort_iter_for(item))
+        self.selection.handler_unblock(self.selection_connect)
+
+    @contextmanager
+    def batch(self, item_signals=True):
+        """Context manager to make many changes to the list at once
+
+        Within the batch the view is detached and the filter, sort order and
+        selection handler are suspended; items are kept in :meth:`sort_by`
+        order only at the end.  ``item-*`` signals are queued, and emitted
+        when the batch ends (after the view is restored), followed by
+        ``batch-finished(added, removed)`` with the lists of items added to
+        and removed from the list.  Batches may be nested, only the outermost
+        batch has an effect.
+
+        Selected items are not reported by ``selected_item(s)`` until the
+        batch ends; items selected within the batch are selected at the end.
+        Likewise, :meth:`scroll_to` and :meth:`ObjectTree.expand_item` (and
+        `collapse_item`) are applied when the batch ends, and
+        :meth:`ObjectList.index_in_view`, :meth:`ObjectTree.item_view_iter`
+        and :meth:`ObjectTree.item_has_child` raise `RuntimeError` within a
+        batch.
+
+        :param item_signals: Whether to emit the queued ``item-*`` signals, or
+                             only ``batch-finished``
+
+        .. versionadded:: X.X.X
+        """
+        self._batch_depth += 1
+        if self._batch_depth == 1:
+            self._begin_batch(item_signals)
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._end_batch()
+
+    def _begin_batch(self, item_signals):
+        self._batch = {'state': self._detach_model(),
+                       'item_signals': item_signals,
+                       'signals': [],
+                       'selection': None,
+                       'view_calls': []}
+
+    def _end_batch(self):
+        batch, self._batch = self._batch, None
+        try:
+            if self._sort_by is not None:
+                self._sort_model()
+        finally:
+            self._attach_model(batch['state'])
+        if batch['selection'] is not None:
+            selection = [item for item in batch['selection'] if item in self]
+            if self.get_selection().get_mode() == gtk.SELECTION_MULTIPLE:
+                self.selected_items = selection
+            else:
+                self.selected_item = selection[-1] if selection else None
+        for method, item, args in batch['view_calls']:
+            # Items may have been removed later in the batch.
+            if item in self:
+                method(item, *args)
+        added = []
+        removed = []
+        for signal in batch['signals']:
+            if signal[0] in ('item-added', 'item-inserted'):
+                added.append(signal[1])
+            elif signal[0] == 'item-removed':
+                removed.append(signal[1])
+            elif signal[0] == 'subtree-inserted':
+                added.extend(signal[1])
+            elif signal[0] == 'subtree-removed':
+                removed.extend(signal[1])
+            if batch['item_signals']:
+                self.emit(*signal)
+        self.emit('batch-finished', added, removed)
+
+    def _defer_view_call(self, method, item, *args):
+        """Queue a call that needs the view until the end of the batch.
+
+        :returns: Whether the call was queued (i.e., a batch is running).
+        """
+        if not self._batch_depth:
+            return False
+        self._batch['view_calls'].append((method, item, args))
+        return True
+
+    def _emit_item_signal(self, *signal):
+        """Emit an ``item-*`` signal, or queue it until the end of the batch.
+        """
+        if self._batch_depth:
+            self._batch['signals'].append(signal)
+        else:
+            self.emit(*signal)
+
+    def _keeps_sorted(self):
+        # Within a batch, the items are sorted once at the end.
+        return self._sort_by is not None and not self._batch_depth
+
     def __len__(self):
         """Number of items in this list
         """
@@ -97,9 +341,39 @@ class ObjectTreeViewBase(gtk.TreeView):
 
     def __delitem__(self, iter):  # XXX
         obj = self._object_at_iter(iter)
-        del self._id_to_iter[id(obj)]
+        # Removing a row also removes its children.
+        for item in itertools.chain([obj], self._model_items(iter)):
+            self._id_to_iter.pop(id(item), None)
+            self._discard_cached(item)
         self.model.remove(iter)
 
+    def _model_items(self, parent=None):
+        """Iterate the items below a base model row (depth first)
+
+        :param parent: Iter of the parent row, or `None` for all items.
+        """
+        model = self.model
+        giter = model.iter_children(parent)
+        while giter is not None:
+            item = model.get_value(giter, 0)
+            # Skip placeholder rows (see ObjectTree lazy children).
+            if item is not PLACEHOLDER:
+                yield item
+            if model.iter_has_child(giter):
+                for item in self._model_items(giter):
+                    yield item
+            giter = model.iter_next(giter)
+
+    def _discard_cached(self, item):
+        for cache in self._caches.itervalues():
+            cache.discard(item)
+
+    def _cache_items(self, items):
+        # Caches built eagerly (e.g., search indexes) add the new items.
+        for cache in self._caches.itervalues():
+            for item in items:
+                cache.add(item)
+
     def set_columns(self, columns):
         assert not self.columns
         self.columns = tuple(columns)
@@ -146,7 +420,9 @@ class ObjectTreeViewBase(gtk.TreeView):
         selection = self.get_selection()
         if selection.get_mode() != gtk.SELECTION_SINGLE:
             raise AttributeError('selected_item not valid for select_multiple')
-        if item is None:
+        if self._batch_depth:
+            self._batch['selection'] = [item]
+        elif item is None:
             selection.unselect_all()
         else:
             giter = self._sort_iter_for(item)
@@ -177,9 +453,12 @@ class ObjectTreeViewBase(gtk.TreeView):
         if selection.get_mode() != gtk.SELECTION_MULTIPLE:
             raise AttributeError('selected_items only valid for '
                                  'select_multiple')
-        selection.unselect_all()
         if new_selection is None:
             new_selection = ()
+        if self._batch_depth:
+            self._batch['selection'] = list(new_selection)
+            return
+        selection.unselect_all()
         for item in new_selection:
             selection.select_iter(self._sort_iter_for(item))
 
@@ -191,10 +470,10 @@ class ObjectTreeViewBase(gtk.TreeView):
             )
 
     def _get_selected_id(self):
+        """Position of the currently selected item"""
         selected_item = self.selected_item
-        selected_id = [i for i, v in enumerate(self) if v == selected_item]
-        if selected_id:
-            return selected_id[0]
+        if selected_item is not None:
+            return self.index(selected_item)
 
     def _set_selected_id(self, id):
         self.selected_item = self[id]
@@ -221,9 +500,13 @@ class ObjectTreeViewBase(gtk.TreeView):
         selection = self.get_selection()
         if selection.get_mode() != gtk.SELECTION_MULTIPLE:
             raise AttributeError('selected_ids only valid for select_multiple')
-        selection.unselect_all()
         if new_selection is None:
             new_selection = ()
+        if self._batch_depth:
+            self._batch['selection'] = [self[row_id]
+                                        for row_id in new_selection]
+            return
+        selection.unselect_all()
         for row_id in new_selection:
             giter = self._sort_iter_for(self[row_id])
             selection.select_iter(giter)
@@ -240,13 +523,99 @@ class ObjectTreeViewBase(gtk.TreeView):
         """
         self.model.clear()
         self._id_to_iter.clear()
+        for cache in self._caches.itervalues():
+            cache.clear()
 
     def update(self, item):
         """Manually update an item's display in the list
 
+        Cached values of the item (e.g., sort keys) are recomputed, and if the
+        list was sorted with :meth:`sort_by` the item is moved to its sorted
+        position.
+
+        If `coalesce_updates` is set, the update is only applied when the main
+        loop is idle (or on :meth:`flush_updates`), together with the other
+        pending updates.
+
         :param item: The item to be updated.
         """
-        self.model.set(self._iter_for(item), 0, item)
+        self.update_many((item, ))
+
+    def update_many(self, items):
+        """Manually update the display of several items in the list
+
+        The cached values of the items are recomputed, and ``row-changed``
+        is emitted by the model for each row.
+
+        :param items: The items to be updated.
+
+        .. versionadded:: X.X.X
+        """
+        if not self.coalesce_updates:
+            self._update_items(items)
+            return
+        self._pending_updates.update((id(item), item) for item in items)
+        if self._flush_source is None:
+            # Flush before the view redraws (`gtk.PRIORITY_REDRAW` is
+            # `PRIORITY_HIGH_IDLE + 20`).
+            self._flush_source = gobject.idle_add(
+                self._on_flush_idle, priority=gobject.PRIORITY_HIGH_IDLE + 10)
+
+    def flush_updates(self):
+        """Apply the updates collected while `coalesce_updates` is set
+
+        .. versionadded:: X.X.X
+        """
+        if self._flush_source is not None:
+            gobject.source_remove(self._flush_source)
+            self._flush_source = None
+        items = self._pending_updates.values()
+        self._pending_updates.clear()
+        # Items may have been removed since they were updated.
+        self._update_items([item for item in items if item in self])
+
+    def _on_flush_idle(self):
+        self._flush_source = None
+        self.flush_updates()
+        return False
+
+    def _update_items(self, items):
+        if self._batch_depth:
+            # The view is rebuilt at the end of the batch.
+            for item in items:
+                self._discard_cached(item)
+                self._cache_items((item, ))
+            return
+        model = self.model
+        for item in items:
+            giter = self._iter_for(item)
+            self._discard_cached(item)
+            self._cache_items((item, ))
+            if self._keeps_sorted():
+                self._resort_row(giter)
+            # Always signalled, for the other listeners of the model (the
+            # view only redraws the row if it is on screen).
+            model.row_changed(model.get_path(giter), giter)
+
+    def invalidate(self, item=None):
+        """Redraw an item whose cached rendering is out of date
+
+        Only needed when the list has a render cache, and the item was
+        changed without calling :meth:`update`.
+
+        :param item: The item to redraw, or `None` to redraw all items.
+
+        .. versionadded:: X.X.X
+        """
+        if item is None:
+            if self.render_cache is not None:
+                self.render_cache.invalidate_all()
+            self.queue_draw()
+            return
+        if self.render_cache is not None:
+            self.render_cache.discard(item)
+        giter = self._iter_for(item)
+        self.model.row_changed(self.model.get_path(giter), giter)
 
     def move_item_down(self, item):
         """Move an item down in the list.
@@ -286,22 +655,67 @@ class ObjectTreeViewBase(gtk.TreeView):
         if prev_iter is not None:
             return self._object_at_iter(prev_iter)
 
-    def set_visible_func(self, visible_func):
+    def set_visible_func(self, visible_func, change=None):
         """Set the function to decide visibility of an item
 
+        The visibility of each item is cached, and only reevaluated when the
+        item is updated (see :meth:`update`) or when a new visible function is
+        set.
+
         :param visible_func: A callable that returns a boolean result to
                              decide if an item should be visible, for
                              example::
 
                                 def is_visible(item):
                                     return True
+        :param change: How the new function relates to the previous one:
+                       `narrow` if it can only hide visible items (e.g., a
+                       longer search string), so that only the visible items
+                       are evaluated; `widen` if it can only show hidden items,
+                       so that only the hidden items are evaluated; or `None`
+                       to evaluate all items.
+
+        .. versionchanged:: X.X.X
+            Cache the visibility of items, and add the `change` argument.
         """
-        self.model_filter.set_visible_func(
-                self._internal_visible_func,
-                visible_func,
-                )
+        if change not in (None, 'narrow', 'widen'):
+            raise ValueError('change must be None, "narrow" or "widen", '
+                             'not %r' % (change, ))
+        visibility = self._caches.get('visible')
         self._visible_func = visible_func
-        self.model_filter.refilter()
+        if visibility is None:
+            self._caches['visible'] = VisibilityCache(visible_func)
+            # While detached, the filter is installed when the model chain is
+            # rebuilt.
+            if self.model_filter is not None:
+                self.model_filter.set_visible_func(
+                    self._internal_visible_func)
+                self.model_filter.refilter()
+        elif change is None:
+            visibility.clear()
+            visibility.key = visible_func
+            if self.model_filter is not None:
+                self.model_filter.refilter()
+        else:
+            visibility.key = visible_func
+            self._refilter_items(visibility, change == 'narrow')
+
+    def _refilter_items(self, visibility, visible):
+        # Reevaluate the items whose cached visibility is `visible` (or that
+        # were not evaluated yet), and make the filter model recheck only the
+        # rows whose visibility changed.
+        changed = []
+        for item in self._model_items():
+            cached = visibility.cached(item)
+            if cached is None or cached == visible:
+                new_visible = bool(visibility.key(item))
+                if new_visible != cached:
+                    visibility.set(item, new_visible)
+                    changed.append(item)
+        model = self.model
+        for item in changed:
+            giter = self._iter_for(item)
+            model.row_changed(model.get_path(giter), giter)
 
     def item_visible(self, item):
         """Return whether an item is visible
@@ -309,46 +723,134 @@ class ObjectTreeViewBase(gtk.TreeView):
         :param item: The item to test visibility
         :rtype: bool
         """
-        return self._visible_func(item)
+        visibility = self._caches.get('visible')
+        if visibility is None:
+            return self._visible_func(item)
+        return visibility.get(item)
+
+    @property
+    def visible_count(self):
+        """Number of items accepted by the visible function
+
+        .. versionadded:: X.X.X
+        """
+        visibility = self._caches.get('visible')
+        if visibility is None:
+            return len(self._id_to_iter)
+        if len(visibility) < len(self._id_to_iter):
+            # Rows the filter model has not evaluated yet (e.g., children of
+            # collapsed rows).
+            visibility.fill(self._model_items())
+        return visibility.n_visible
+
+    @property
+    def hidden_count(self):
+        """Number of items rejected by the visible function
+
+        .. versionadded:: X.X.X
+        """
+        return len(self._id_to_iter) - self.visible_count
 
     def sort_by(self, attr_or_key, direction='asc'):
         """Sort the view by an attribute or key
 
-        :param attr_or_key: The attribute or key to sort by
+        The items are reordered in the model, and are kept in order as they
+        are added or updated.  The key of each item is computed once and
+        cached until the item is updated.
+
+        :param attr_or_key: The attribute or key to sort by, or `None` to stop
+                            keeping the items sorted
         :param direction: Either `asc` or `desc` indicating the direction of
                           sorting
+
+        .. versionchanged:: X.X.X
+            Sort on precomputed keys and apply the result with a single
+            reorder of the model, instead of comparing items through a sort
+            function.
         """
-        # work out the direction
-        if direction in ('+', 'asc', gtk.SORT_ASCENDING):
-            direction = gtk.SORT_ASCENDING
-        elif direction in ('-', 'desc', gtk.SORT_DESCENDING):
-            direction = gtk.SORT_DESCENDING
-        else:
-            raise AttributeError('unrecognised direction')
+        if attr_or_key is None:
+            self._sort_by = None
+            self._caches.pop('sort_by', None)
+            return
+        direction = sort_direction(direction)
         if callable(attr_or_key):
             # is a key
-            sort_func = self._key_sort_func
+            key = attr_or_key
         else:
             # it's an attribute
-            sort_func = self._attr_sort_func
-        self.model.set_default_sort_func(sort_func, attr_or_key)
-        self.model.set_sort_column_id(-1, direction)
-
-    def search_by(self, attr_or_test):
+            def key(obj, attr=attr_or_key):
+                return getattr(obj, attr, None)
+        keys = self._caches['sort_by'] = SortKeyCache(key)
+        self._sort_by = keys, direction == gtk.SORT_DESCENDING
+        self._sort_model()
+
+    def search_by(self, attr_or_test, index=False):
+        """Set the attribute or test function of the interactive search
+
+        :param attr_or_test: An attribute whose value must contain the search
+                             key, or a callable ``test(item, key)`` returning
+                             whether an item matches.
+        :param index: Whether to match an attribute through a search index
+                      (see :meth:`find_all`) rather than converting the value
+                      of each row for each key.
+
+        .. versionchanged:: X.X.X
+            Add the `index` argument.
+        """
         if callable(attr_or_test):
             self.set_search_equal_func(self._test_search_func, attr_or_test)
+        elif index:
+            self.set_search_equal_func(self._indexed_search_func,
+                                       self._search_index_for(attr_or_test))
         else:
             self.set_search_equal_func(self._attr_search_func, attr_or_test)
 
+    def find_all(self, column, text):
+        """Find the items whose value contains a text (case insensitive)
+
+        Matches are looked up in a search index, which is built on first use
+        and then kept up to date as items are added, updated and removed.
+
+        :param column: A Column, or the name of an attribute
+        :param text: The text to find
+        :returns: The matching items, in model order
+
+        .. versionadded:: X.X.X
+        """
+        items = self._search_index_for(column).matches(text)
+        model = self.model
+        return sorted(items,
+                      key=lambda item: model.get_path(self._iter_for(item)))
+
+    def _search_index_for(self, column):
+        """Search index of a Column or attribute name."""
+        key = 'search', column
+        index = self._caches.get(key)
+        if index is None:
+            if isinstance(column, basestring):
+                def text(obj, attr=column):
+                    return getattr(obj, attr, '')
+            else:
+                text = column.search_text_for
+            index = self._caches[key] = SearchIndex(text)
+            for item in self._model_items():
+                index.add(item)
+        return index
+
     def _iter_for(self, obj):
         return self._id_to_iter[id(obj)]
 
     def _view_iter_for(self, obj):
         giter = self._iter_for(obj)
+        if self.model_filter is None:
+            # Detached (e.g., in a batch): the view shows the base model.
+            return giter
         return self.model_filter.convert_child_iter_to_iter(giter)
 
     def _sort_iter_for(self, obj):
         viter = self._view_iter_for(obj)
+        if self.model_sort is None:
+            return viter
         return self.model_sort.convert_child_iter_to_iter(None, viter)
 
     def _next_iter_for(self, obj):
@@ -364,7 +866,7 @@ class ObjectTreeViewBase(gtk.TreeView):
         return self._view_path_for_iter(self._view_iter_for(obj))
 
     def _view_path_for_iter(self, giter):
-        return self.model_filter.get_string_from_iter(giter)
+        return (self.model_filter or self.model).get_string_from_iter(giter)
 
     def _path_for_iter(self, giter):
         return self.model.get_string_from_iter(giter)
@@ -420,6 +922,8 @@ class ObjectTreeViewBase(gtk.TreeView):
         self.connect('button-press-event', self._on_button_press_event)
         self.connect('query-tooltip', self._on_query_tooltip)
         self.connect('row-activated', self._on_row_activated)
+        if self.render_cache is not None:
+            self.connect('item-changed', self._on_item_changed)
         self.selection = self.get_selection()
         self.selection_connect = self.selection.connect(
                 'changed', self._on_selection_changed)
@@ -445,7 +949,6 @@ class ObjectTreeViewBase(gtk.TreeView):
 
     def _on_selection_changed(self, selection):
         self.emit('selection-changed')
-        self.connect('query-tooltip', self._on_query_tooltip)
 
     def _on_query_tooltip(self, objectlist, x, y, ktip, tooltip):
         if not self.get_tooltip_context(x, y, ktip):
@@ -457,29 +960,160 @@ class ObjectTreeViewBase(gtk.TreeView):
                 return False
             path, column, rx, ry = item_spec
             obj = self._object_at_path(path)
+            if obj is None or obj is PLACEHOLDER:
+                return False
             pcol = column.get_data('pygtkhelpers::column')
             return pcol.render_tooltip(tooltip, obj)
 
+    def _on_item_changed(self, objectlist, item, attr, value):
+        self.render_cache.discard(item)
+
     def _on_row_activated(self, objectlist, path, column, *k):
-        self.emit('item-activated', self._object_at_sort_iter(path))
+        item = self._object_at_sort_iter(path)
+        if item is not PLACEHOLDER:
+            self.emit('item-activated', item)
 
     def _visible_func(self, obj):
         # XXX: this one gets dynamically replaced
         return True
 
-    def _internal_visible_func(self, model, iter, visible_func):
-        return visible_func(model[iter][0])
+    def _internal_visible_func(self, model, iter):
+        obj = model.get_value(iter, 0)
+        if obj is None:
+            # The row is being inserted, its item is not set yet.
+            return False
+        elif obj is PLACEHOLDER:
+            # Keeps the expander of items whose children are not loaded.
+            return True
+        return self._caches['visible'].get(obj)
+
+    def _sort_keys_for(self, column):
+        """Cache of the sort keys of a column."""
+        keys = self._caches.get(column)
+        if keys is None:
+            keys = self._caches[column] = SortKeyCache(column.sort_key_for)
+        return keys
+
+    def _on_sort_column_changed(self, model_sort):
+        # Compute the keys of the sort column in one pass, before the sort
+        # model compares them.
+        column_id, order = model_sort.get_sort_column_id()
+        if self.columns and column_id is not None and \
+                0 <= column_id < len(self.columns):
+            self._sort_keys_for(self.columns[column_id]).fill(
+                self._model_items())
+
+    def _sort_model(self, parent=None):
+        """Reorder the rows below `parent` (recursively) by the sort_by key.
+        """
+        model = self.model
+        keys, reverse = self._sort_by
+        # Positions of the items, and of placeholder rows (kept last).
+        positions = []
+        item_keys = []
+        placeholders = []
+        parents = []
+        position = 0
+        giter = model.iter_children(parent)
+        while giter is not None:
+            item = model.get_value(giter, 0)
+            if item is PLACEHOLDER:
+                placeholders.append(position)
+            else:
+                positions.append(position)
+                item_keys.append(keys.get(item))
+            if model.iter_has_child(giter):
+                parents.append(giter)
+            giter = model.iter_next(giter)
+            position += 1
+        if len(positions) > 1:
+            new_order = [positions[i] for i in
+                         sorted(xrange(len(positions)),
+                                key=item_keys.__getitem__, reverse=reverse)]
+            new_order.extend(placeholders)
+            if isinstance(model, gtk.TreeStore):
+                model.reorder(parent, new_order)
+            else:
+                model.reorder(new_order)
+        for giter in parents:
+            self._sort_model(giter)
 
-    def _attr_sort_func(self, model, iter1, iter2, attr):
-        # how the hell is this a filter model?
-        obj1 = self._object_at_iter(iter1)
-        obj2 = self._object_at_iter(iter2)
-        return cmp(getattr(obj1, attr, None), getattr(obj2, attr, None))
+    def _sorted_position(self, item, parent=None, lo=0, hi=None):
+        """Position to insert an item below `parent` to keep the sort_by
+        order, searching the positions in ``[lo, hi)``.
+        """
+        model = self.model
+        keys, reverse = self._sort_by
+        key = keys.get(item)
+        if hi is None:
+            hi = self._n_sorted_children(parent)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_mid = keys.get(model.get_value(model.iter_nth_child(parent,
+                                                                    mid), 0))
+            if (key_mid < key) if reverse else (key < key_mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
 
-    def _key_sort_func(self, model, iter1, iter2, key):
-        obj1 = self._object_at_iter(iter1)
-        obj2 = self._object_at_iter(iter2)
-        return cmp(key(obj1), key(obj2))
+    def _n_sorted_children(self, parent):
+        """Number of children of `parent` kept in order, i.e., without a
+        trailing placeholder row.
+        """
+        model = self.model
+        n_children = model.iter_n_children(parent)
+        if n_children and model.get_value(
+                model.iter_nth_child(parent, n_children - 1), 0) \
+                is PLACEHOLDER:
+            n_children -= 1
+        return n_children
+
+    def _insert_row(self, parent, position, item):
+        """Insert an item in the base model, at its sorted position if the
+        list was sorted with :meth:`sort_by`.
+        """
+        if self._keeps_sorted():
+            position = self._sorted_position(item, parent)
+        if isinstance(self.model, gtk.TreeStore):
+            giter = self.model.insert(parent, position, (item, ))
+        else:
+            giter = self.model.insert(position, (item, ))
+        self._id_to_iter[id(item)] = giter
+        self._cache_items((item, ))
+        return giter
+
+    def _resort_row(self, giter):
+        """Move a row to its sorted position after its key changed."""
+        model = self.model
+        keys, reverse = self._sort_by
+        parent = model.iter_parent(giter)
+        position = model.get_path(giter)[-1]
+        n_children = model.iter_n_children(parent)
+        n_sorted = self._n_sorted_children(parent)
+        item = model.get_value(giter, 0)
+        key = keys.get(item)
+
+        def key_at(i):
+            return keys.get(model.get_value(model.iter_nth_child(parent, i),
+                                            0))
+        if reverse:
+            before = position > 0 and key_at(position - 1) < key
+            after = position < n_sorted - 1 and key < key_at(position + 1)
+        else:
+            before = position > 0 and key < key_at(position - 1)
+            after = position < n_sorted - 1 and key_at(position + 1) < key
+        if before:
+            target = self._sorted_position(item, parent, 0, position)
+        elif after:
+            target = self._sorted_position(item, parent, position + 1,
+                                           n_sorted)
+        else:
+            return
+        if target < n_children:
+            model.move_before(giter, model.iter_nth_child(parent, target))
+        else:
+            model.move_before(giter, None)
 
     def _attr_search_func(self, model, column, key, iter, attr):
         obj = model[iter][0]
@@ -490,7 +1124,12 @@ class ObjectTreeViewBase(gtk.TreeView):
         obj = model[iter][0]
         return not test(obj, key)
 
+    def _indexed_search_func(self, model, column, key, iter, index):
+        return id(model.get_value(iter, 0)) not in index.matching_ids(key)
+
     def scroll_to(self, obj):
+        if self._defer_view_call(self.scroll_to, obj):
+            return
         path = self._view_path_for(obj)
         self.scroll_to_cell(path)
 
@@ -504,18 +1143,58 @@ class ObjectList(ObjectTreeViewBase):
     gsignal('item-inserted', object, int)
     gsignal('item-removed', object, int)
 
+    #: Minimum number of items for :meth:`extend` to load the items with the
+    #: filter and sort models detached from the list.
+    bulk_threshold = 100
+
+    def index(self, item):
+        """Position of an item in the list
+
+        The position is read from the row of the item, in logarithmic time.
+
+        :param item: The item to find.
+        :raises ValueError: If the item is not present in the list.
+
+        .. versionadded:: X.X.X
+        """
+        if item not in self:
+            raise ValueError('objectlist.index(item) failed, item not in list')
+        return self.model.get_path(self._iter_for(item))[0]
+
+    def index_in_view(self, item):
+        """Position of an item as displayed, i.e., after filtering and sorting
+
+        :param item: The item to find.
+        :returns: The position, or `None` if the item is filtered out.
+        :raises ValueError: If the item is not present in the list.
+        :raises RuntimeError: Within a :meth:`batch`, since the view order is
+                              only known when the batch ends.
+
+        .. versionadded:: X.X.X
+        """
+        if self._batch_depth:
+            raise RuntimeError('objectlist.index_in_view(item) is not '
+                               'available within a batch')
+        path = self.model_filter.convert_child_path_to_path((self.index(item),))
+        if path is not None:
+            return self.model_sort.convert_child_path_to_path(path)[0]
+
     def remove(self, item):
         """Remove an item from the list
 
         :param item: The item to remove from the list.
         :raises ValueError: If the item is not present in the list.
+
+        .. versionchanged:: X.X.X
+            ``item-removed`` reports the position of the item in the list (as
+            ``item-inserted`` does), rather than its position after filtering.
         """
         if item not in self:
             raise ValueError('objectlist.remove(item) failed, item not in list')
-        item_id = int(self._view_path_for(item))
+        item_id = self.index(item)
         giter = self._iter_for(item)
         del self[giter]
-        self.emit('item-removed', item, item_id)
+        self._emit_item_signal('item-removed', item, item_id)
 
     def create_model(self):
         return gtk.ListStore(object)
@@ -529,11 +1208,12 @@ class ObjectList(ObjectTreeViewBase):
         """
         if item in self:
             raise ValueError("item %s already in list" % item)
-        modeliter = self.model.insert(position, (item,))
-        self._id_to_iter[id(item)] = modeliter
+        modeliter = self._insert_row(None, position, item)
+        if self._keeps_sorted():
+            position = self.model.get_path(modeliter)[0]
         if select:
             self.selected_item = item
-        self.emit('item-inserted', item, position)
+        self._emit_item_signal('item-inserted', item, position)
 
     def append(self, item, select=False):
         """Add an item to the end of the list.
@@ -543,28 +1223,240 @@ class ObjectList(ObjectTreeViewBase):
         """
         if item in self:
             raise ValueError("item %s already in list" % item)
-        modeliter = self.model.append((item,))
-        self._id_to_iter[id(item)] = modeliter
+        if not self._keeps_sorted():
+            modeliter = self.model.append((item,))
+            self._id_to_iter[id(item)] = modeliter
+            self._cache_items((item, ))
+        else:
+            self._insert_row(None, -1, item)
         if select:
             self.selected_item = item
-        self.emit('item-added', item)
+        self._emit_item_signal('item-added', item)
 
     def extend(self, iter):
         """Add a sequence of items to the end of the list
 
+        Sequences of at least :attr:`bulk_threshold` items are added in a
+        single pass within a :meth:`batch`.
+
+        ``item-added`` is emitted for each item, followed by a single
+        ``items-added`` carrying the list of all added items.
+
         :param iter: The iterable of items to add.
+        :raises ValueError: If an item is already in the list (in which case
+                            no items are added).
+
+        .. versionchanged:: X.X.X
+            Add large sequences in bulk and emit ``items-added``.
         """
-        for item in iter:
-            self.append(item)
+        items = list(iter)
+        if not items:
+            return
+        if len(items) < self.bulk_threshold:
+            for item in items:
+                self.append(item)
+        else:
+            added = set()
+            for item in items:
+                if item in self or id(item) in added:
+                    raise ValueError("item %s already in list" % item)
+                added.add(id(item))
+            with self.batch():
+                append = self.model.append
+                self._id_to_iter.update((id(item), append((item, )))
+                                        for item in items)
+                self._cache_items(items)
+                for item in items:
+                    self._emit_item_signal('item-added', item)
+        self._emit_item_signal('items-added', items)
+
+    def set_items(self, new_items, key=None):
+        """Replace the items of the list, changing only the rows that differ
+
+        Items that are no longer present are removed, new items are inserted,
+        and the remaining rows are moved with a single reorder of the model.
+        Rows are not rebuilt, so the selection (of the items still present)
+        and the scroll position are kept.
+
+        Items are matched by identity, or by `key` if given.  An item whose
+        key matches a present item replaces it in its row, and is updated as
+        by :meth:`update_many`.  Present items matched by identity are not
+        updated.  If several present items have the same key, they cannot be
+        matched, so all of them are removed and the new items inserted.
+
+        ``item-removed`` and ``item-inserted`` are emitted for the removed
+        and inserted items, with their positions at the time of the change.
+
+        :param new_items: The items the list should contain, in order.
+        :param key: Callable returning the key identifying an item.
+        :raises ValueError: If two of the new items have the same key (in
+                            which case the list is not changed).
+
+        .. versionadded:: X.X.X
+        """
+        if key is None:
+            key = id
+        new_items = list(new_items)
+        new_keys = [key(item) for item in new_items]
+        new_positions = dict((item_key, i) for i, item_key in
+                             enumerate(new_keys))
+        if len(new_positions) < len(new_items):
+            raise ValueError('new items have duplicate keys')
+        model = self.model
+        old_items = [row[0] for row in model]
+        old_keys = [key(item) for item in old_items]
+        old_positions = dict((item_key, i) for i, item_key in
+                             enumerate(old_keys))
+        if len(old_positions) < len(old_items):
+            # Present items with the same key cannot be matched (and would
+            # give an invalid reorder), so no row is kept.
+            old_positions = {}
+        if self._batch_depth:
+            selected = []
+        else:
+            selected = self._hold_selection()
+        try:
+            # Remove from the end, so the positions of the remaining rows
+            # are those of the old list.
+            removed = set()
+            for position in xrange(len(old_items) - 1, -1, -1):
+                if old_keys[position] not in new_positions or \
+                        not old_positions:
+                    item = old_items[position]
+                    removed.add(id(item))
+                    del self[self._iter_for(item)]
+                    self._emit_item_signal('item-removed', item, position)
+            replaced = []
+            for item, item_key in itertools.izip(new_items, new_keys):
+                position = old_positions.get(item_key)
+                if position is None or old_items[position] is item:
+                    continue
+                old_item = old_items[position]
+                giter = self._id_to_iter.pop(id(old_item))
+                self._discard_cached(old_item)
+                self._id_to_iter[id(item)] = giter
+                model.set_value(giter, 0, item)
+                replaced.append(item)
+            if replaced:
+                self._update_items(replaced)
+            kept_keys = [item_key for item_key in old_keys
+                         if item_key in new_positions and
+                         item_key in old_positions]
+            added = [item for item, item_key in
+                     itertools.izip(new_items, new_keys)
+                     if item_key not in old_positions]
+            if self._keeps_sorted():
+                for item in added:
+                    modeliter = self._insert_row(None, -1, item)
+                    self._emit_item_signal('item-inserted', item,
+                                           model.get_path(modeliter)[0])
+            elif kept_keys == [item_key for item_key in new_keys
+                               if item_key in old_positions]:
+                # The present items keep their order, so inserting each new
+                # item at its position gives the new order.
+                for position, item_key in enumerate(new_keys):
+                    if item_key not in old_positions:
+                        item = new_items[position]
+                        self._insert_row(None, position, item)
+                        self._emit_item_signal('item-inserted', item,
+                                               position)
+            else:
+                append = model.append
+                self._id_to_iter.update((id(item), append((item, )))
+                                        for item in added)
+                self._cache_items(added)
+                current = dict((item_key, i) for i, item_key in
+                               enumerate(kept_keys))
+                n_kept = len(kept_keys)
+                for i, item in enumerate(added):
+                    current[key(item)] = n_kept + i
+                model.reorder([current[item_key] for item_key in new_keys])
+                for item in added:
+                    self._emit_item_signal('item-inserted', item,
+                                           new_positions[key(item)])
+        finally:
+            if not self._batch_depth:
+                self.selection.handler_unblock(self.selection_connect)
+        if any(id(item) in removed for item in selected):
+            self.emit('selection-changed')
 
 
 class SubObjectTree(object):
+    """Items of a subtree of an ObjectTree, with their model paths
+
+    :param items: The items, depth first
+    :param item_paths: The path (tuple) of each item
+    """
     def __init__(self, items, item_paths):
         self.items = items
         self.item_paths = item_paths
 
-    def copy(self):
-        return copy.deepcopy(self)
+    def copy(self, clone=None):
+        """Copy the structure of the subtree
+
+        :param clone: A callable returning the copy of an item (e.g.,
+                      `copy.copy`, `copy.deepcopy` or :class:`CopyOnWrite`),
+                      or `None` to share the items with this subtree
+
+        .. versionchanged:: X.X.X
+            Only copy the structure (rather than `copy.deepcopy` the whole
+            subtree), and add the `clone` argument.
+        """
+        if clone is None:
+            items = list(self.items)
+        else:
+            items = [clone(item) for item in self.items]
+        return SubObjectTree(items, list(self.item_paths))
+
+    def dumps(self):
+        """Serialize the subtree (e.g., for the clipboard)
+
+        The items must be picklable.
+
+        :returns: A compressed pickle of the items and paths, as a string
+
+        .. versionadded:: X.X.X
+        """
+        return zlib.compress(cPickle.dumps((self.items, self.item_paths),
+                                           cPickle.HIGHEST_PROTOCOL))
+
+    @classmethod
+    def loads(cls, data, classes=()):
+        """Create a subtree from the string returned by :meth:`dumps`
+
+        Unpickling may only create instances of `classes` (and of
+        :class:`CopyOnWrite`), besides built-in values, so loading data from
+        another process (e.g., from the clipboard) cannot call arbitrary
+        functions.  Item classes that define ``__reduce__`` or
+        ``__setstate__`` must only be listed if those are safe to call with
+        untrusted arguments.
+
+        :param data: The string returned by :meth:`dumps`
+        :param classes: The classes of the items, and of their attribute
+                        values
+        :raises cPickle.UnpicklingError: If the data refers to another class
+                                         or function.
+
+        .. versionadded:: X.X.X
+        """
+        allowed = dict(((class_.__module__, class_.__name__), class_)
+                       for class_ in itertools.chain([CopyOnWrite, set,
+                                                      frozenset, complex],
+                                                     classes))
+
+        def find_global(module, name):
+            if (module, name) in allowed:
+                return allowed[module, name]
+            elif (module, name) == ('copy_reg', '__newobj__'):
+                # Creates an instance of a class, which is itself checked.
+                return _newobj
+            raise cPickle.UnpicklingError('%s.%s is not an allowed class' %
+                                          (module, name))
+
+        unpickler = cPickle.Unpickler(StringIO(zlib.decompress(data)))
+        unpickler.find_global = find_global
+        items, item_paths = unpickler.load()
+        return cls(items, item_paths)
 
     def __iter__(self):
         if self.item_paths:
@@ -576,6 +1468,59 @@ class SubObjectTree(object):
         return str(zip(self.items, self.item_paths))
 
 
+def _newobj(class_, *args):
+    # Like `copy_reg.__newobj__`, for classes allowed by SubObjectTree.loads
+    if not isinstance(class_, type):
+        raise cPickle.UnpicklingError('%r is not a class' % (class_, ))
+    return class_.__new__(class_, *args)
+
+
+class CopyOnWrite(object):
+    """Copy of an item that shares the item until an attribute is set
+
+    Attributes are read from the original item.  Setting or deleting an
+    attribute first replaces the item by a shallow copy, so the original is
+    not modified.  Changes to mutable attribute values are not detected.
+
+    ``isinstance(proxy, cls)`` checks the class of the item (``type(proxy)``
+    is still `CopyOnWrite`).
+
+    :param item: The item to copy
+
+    .. versionadded:: X.X.X
+    """
+    __slots__ = ('_cow_item', '_cow_copied')
+
+    def __init__(self, item):
+        object.__setattr__(self, '_cow_item', item)
+        object.__setattr__(self, '_cow_copied', False)
+
+    def _cow_copy(self):
+        if not self._cow_copied:
+            object.__setattr__(self, '_cow_item', copy.copy(self._cow_item))
+            object.__setattr__(self, '_cow_copied', True)
+        return self._cow_item
+
+    @property
+    def __class__(self):
+        return type(self._cow_item)
+
+    def __getattr__(self, name):
+        return getattr(self._cow_item, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cow_copy(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self._cow_copy(), name)
+
+    def __reduce__(self):
+        return CopyOnWrite, (self._cow_item, )
+
+    def __repr__(self):
+        return '<CopyOnWrite %r>' % (self._cow_item, )
+
+
 class Node(object):
     def __init__(self, parent, item=None):
         self.item = item
@@ -617,30 +1562,144 @@ def get_node_tree(subtree):
 
 class ObjectTree(ObjectTreeViewBase):
     """An object tree
+
+    The children of an item may be loaded when the item is first expanded,
+    see the `lazy_children` argument of :meth:`append`.
     """
 
     __gtype_name__ = "PyGTKHelpersObjectTree"
 
+    #: Whether lazy children are loaded in a worker thread (and added as they
+    #: are loaded) rather than in the main loop.
+    threaded_loading = False
+
     gsignal('item-expanded', object)
     gsignal('item-collapsed', object)
     gsignal('item-inserted', object, object)
     gsignal('item-removed', object, object)
+    # subtree-inserted(items), subtree-removed(items)
+    gsignal('subtree-inserted', object)
+    gsignal('subtree-removed', object)
 
     def _connect_internal(self):
         ObjectTreeViewBase._connect_internal(self)
+        #: The selected items, see :class:`TreeSelectionSet`.  Connected
+        #: before the expand handlers, which read it.
+        self.selected_set = TreeSelectionSet(self)
         self.connect('row-expanded', self._on_row_expanded)
         self.connect('row-collapsed', self._on_row_collapsed)
+        # Children index: id(parent) (or None for top-level items) ->
+        # (parent, list of child items), in model order.  Entries are dropped
+        # when the children of the parent change, and rebuilt on demand.
+        self._children = {}
+        # Lazy children: id(item) -> (item, loader), of items whose children
+        # are not loaded yet and of items whose children were loaded.
+        self._lazy = {}
+        self._loaded = {}
+        # id(item) -> GeneratorTask of items loading children in a thread
+        self._loading = {}
+        self.model.connect('row-inserted', self._on_model_row_changed)
+        self.model.connect('row-deleted', self._on_model_row_changed)
+        self.model.connect('rows-reordered', self._on_model_rows_reordered)
+
+    def _on_selection_changed(self, selection):
+        # The handlers of selection-changed may read the selected items.
+        self.selected_set.selection_changed()
+        ObjectTreeViewBase._on_selection_changed(self, selection)
+
+    def _on_model_row_changed(self, model, path, *args):
+        if len(path) == 1:
+            self._children.pop(None, None)
+        else:
+            parent = model.get_value(model.get_iter(path[:-1]), 0)
+            self._children.pop(id(parent), None)
+
+    def _on_model_rows_reordered(self, model, path, giter, new_order):
+        if giter is None:
+            self._children.pop(None, None)
+        else:
+            self._children.pop(id(model.get_value(giter, 0)), None)
+
+    def _child_items(self, parent=None):
+        """The children of an item (or the top-level items), in model order.
+        """
+        key = None if parent is None else id(parent)
+        entry = self._children.get(key)
+        # Check the parent, in case the id belonged to a removed item.
+        if entry is None or entry[0] is not parent:
+            model = self.model
+            if parent is None:
+                giter = model.get_iter_first()
+            else:
+                giter = model.iter_children(self._iter_for(parent))
+            children = []
+            while giter is not None:
+                child = model.get_value(giter, 0)
+                if child is not PLACEHOLDER:
+                    children.append(child)
+                giter = model.iter_next(giter)
+            entry = self._children[key] = parent, children
+        return entry[1]
+
+    def _parent_of(self, item):
+        parent_iter = self.model.iter_parent(self._iter_for(item))
+        if parent_iter is not None:
+            return self.model.get_value(parent_iter, 0)
+
+    def _iter_descendants(self, items):
+        """Iterate items and their descendants, depth first."""
+        stack = [iter(items)]
+        while stack:
+            for item in stack[-1]:
+                yield item
+                children = self._child_items(item)
+                if children:
+                    stack.append(iter(children))
+                break
+            else:
+                stack.pop()
+
+    def __delitem__(self, iter):
+        obj = self._object_at_iter(iter)
+        for item in self._iter_descendants([obj]):
+            self._children.pop(id(item), None)
+            self._lazy.pop(id(item), None)
+            self._loaded.pop(id(item), None)
+            task = self._loading.pop(id(item), None)
+            if task is not None:
+                task.stop()
+        ObjectTreeViewBase.__delitem__(self, iter)
+
+    def clear(self):
+        """Clear all the items in the tree
+        """
+        for task in self._loading.itervalues():
+            task.stop()
+        ObjectTreeViewBase.clear(self)
+        self._children.clear()
+        self._lazy.clear()
+        self._loaded.clear()
+        self._loading.clear()
 
     def create_model(self):
         return gtk.TreeStore(object)
 
-    def append(self, item, parent=None, select=False):
+    def append(self, item, parent=None, select=False, lazy_children=None):
         """Add an item to the end of the list.
 
         :param item: The item to be added
         :param parent: The parent item to add this as a child of, or None for
                        a top-level node
         :param select: Whether the item should be selected after adding
+        :param lazy_children: A callable ``loader(item)`` returning the
+                              children of the item, called when the item is
+                              first expanded.  It returns (or yields)
+                              ``(child, child_loader)`` pairs, where
+                              `child_loader` is the `lazy_children` of the
+                              child, or `None`.
+
+        .. versionchanged:: X.X.X
+            Add the `lazy_children` argument.
         """
         if item in self:
             raise ValueError("item %s already in list" % item)
@@ -648,11 +1707,112 @@ class ObjectTree(ObjectTreeViewBase):
             giter = self._iter_for(parent)
         else:
             giter = None
-        modeliter = self.model.append(giter, (item,))
-        self._id_to_iter[id(item)] = modeliter
+        if not self._keeps_sorted():
+            modeliter = self.model.append(giter, (item,))
+            self._id_to_iter[id(item)] = modeliter
+            self._cache_items((item, ))
+        else:
+            self._insert_row(giter, -1, item)
+        if lazy_children is not None:
+            self._set_lazy(item, lazy_children)
         if select:
             self.selected_item = item
 
+    def _set_lazy(self, item, loader):
+        # A placeholder child row shows the expander.
+        self.model.append(self._iter_for(item), (PLACEHOLDER, ))
+        self._lazy[id(item)] = item, loader
+
+    def _remove_placeholder(self, item):
+        model = self.model
+        giter = model.iter_children(self._iter_for(item))
+        while giter is not None:
+            if model.get_value(giter, 0) is PLACEHOLDER:
+                model.remove(giter)
+                return
+            giter = model.iter_next(giter)
+
+    def children_loaded(self, item):
+        """Whether the children of an item have been loaded
+
+        Always true for items appended without `lazy_children`.
+
+        .. versionadded:: X.X.X
+        """
+        return id(item) not in self._lazy and id(item) not in self._loading
+
+    def load_children(self, item):
+        """Load the lazy children of an item, if not loaded yet
+
+        Loading in a worker thread (see :attr:`threaded_loading`) completes
+        asynchronously.
+
+        .. versionadded:: X.X.X
+        """
+        entry = self._lazy.pop(id(item), None)
+        if entry is None:
+            return
+        loader = entry[1]
+        if not self.threaded_loading:
+            for child, child_loader in loader(item):
+                self.append(child, parent=item, lazy_children=child_loader)
+            # Remove the placeholder last, rows without children collapse.
+            self._remove_placeholder(item)
+            self._loaded[id(item)] = entry
+            self._on_children_loaded(item)
+            return
+
+        def work(item):
+            # Pass each (child, child_loader) sequence as one argument, since
+            # the task only unpacks tuples.
+            for child_entry in loader(item):
+                yield (child_entry, )
+
+        def add_child(child_entry):
+            child, child_loader = child_entry
+            if id(item) in self._loading:
+                self.append(child, parent=item, lazy_children=child_loader)
+                if id(item) not in self._loaded:
+                    self._remove_placeholder(item)
+                    self._loaded[id(item)] = entry
+
+        def complete():
+            if self._loading.pop(id(item), None) is not None:
+                if id(item) not in self._loaded:
+                    self._remove_placeholder(item)
+                    self._loaded[id(item)] = entry
+                self._on_children_loaded(item)
+
+        task = self._loading[id(item)] = GeneratorTask(work, add_child,
+                                                        complete)
+        task.start(item)
+
+    def _on_children_loaded(self, item):
+        if self.item_expanded(item):
+            self._on_item_expanded(item)
+
+    def unload_collapsed(self):
+        """Unload the lazy children of collapsed items, to save memory
+
+        The children are loaded again when the item is expanded.
+
+        :returns: The number of items whose children were unloaded.
+
+        .. versionadded:: X.X.X
+        """
+        unloaded = 0
+        for item, loader in self._loaded.values():
+            if self._loaded.get(id(item), (None, ))[0] is not item or \
+                    self.item_expanded(item):
+                # Removed along with a collapsed parent, or still shown.
+                continue
+            for child in list(self._child_items(item)):
+                del self[self._iter_for(child)]
+            del self._loaded[id(item)]
+            self._set_lazy(item, loader)
+            unloaded += 1
+        return unloaded
+
     def extend(self, iter, parent=None):
         """Add a sequence of items to the end of the list
 
@@ -670,6 +1830,8 @@ class ObjectTree(ObjectTreeViewBase):
         :param open_all: Whether all child nodes should be recursively
                          expanded.
         """
+        if self._defer_view_call(self.expand_item, item, open_all):
+            return
         self.expand_row(self._view_path_for(item), open_all)
 
     def collapse_item(self, item):
@@ -677,6 +1839,8 @@ class ObjectTree(ObjectTreeViewBase):
 
         :param item: The item to show collapsed
         """
+        if self._defer_view_call(self.collapse_item, item):
+            return
         self.collapse_row(self._path_for(item))
 
     def item_expanded(self, item):
@@ -688,13 +1852,24 @@ class ObjectTree(ObjectTreeViewBase):
 
     def _on_row_expanded(self, objecttree, giter, path):
         item = self._object_at_sort_iter(giter)
-        if item in self.selected_items:
-            # Since this item was selected before expanding, select all
-            # children.
+        if id(item) in self._lazy:
+            # item-expanded is emitted once the children are loaded.
+            self.load_children(item)
+        elif id(item) not in self._loading:
+            self._on_item_expanded(item)
+
+    def _on_item_expanded(self, item):
+        if self.selection.get_mode() == gtk.SELECTION_MULTIPLE and \
+                item in self.selected_set:
+            # Since this item was selected before expanding, select the
+            # children (whose own children are implied while they are
+            # collapsed, and selected when they are expanded).
             self.selection.handler_block(self.selection_connect)
-            self.selected_items += self._get_children(item)
+            for child in self._child_items(item):
+                if self.item_visible(child):
+                    self.selection.select_iter(self._sort_iter_for(child))
             self.selection.handler_unblock(self.selection_connect)
-        return self.emit('item-expanded', self._object_at_sort_iter(giter))
+        return self.emit('item-expanded', item)
 
     def _on_row_collapsed(self, objecttree, giter, path):
         return self.emit('item-collapsed', self._object_at_sort_iter(giter))
@@ -703,42 +1878,88 @@ class ObjectTree(ObjectTreeViewBase):
         return self.model[self._path_for(item)].iter
 
     def item_view_iter(self, item):
+        """Iter of an item in the sort model shown by the view
+
+        :raises RuntimeError: Within a :meth:`batch`, since the view models
+                              are detached until the batch ends.
+        """
+        if self._batch_depth:
+            raise RuntimeError('objectlist.item_view_iter(item) is not '
+                               'available within a batch')
         return self.model_sort[self._view_path_for(item)].iter
 
     def item_has_child(self, item):
+        """Whether an item has children shown by the view
+
+        :raises ValueError: If the item is not present in the tree.
+        :raises RuntimeError: Within a :meth:`batch`, since the visible
+                              children are only known when the batch ends.
+        """
         if item not in self:
             raise ValueError('objectlist.item_has_child(item) failed, item not'
                              ' in list')
+        if self._batch_depth:
+            raise RuntimeError('objectlist.item_has_child(item) is not '
+                               'available within a batch')
         return self.model_sort.iter_has_child(self.item_view_iter(item))
 
     def _iter_siblings(self, item):
-        giter = self.item_view_iter(item)
-        while giter:
-            item = self[self.model_sort.get_path(giter)]
-            for c in self._iter_children(item):
-                yield c
-            giter = self.model_sort.iter_next(giter)
+        """Iterate an item, its following siblings and their descendants,
+        depth first."""
+        siblings = self._child_items(self._parent_of(item))
+        position = self.model.get_path(self._iter_for(item))[-1]
+        return self._iter_descendants(itertools.islice(siblings, position,
+                                                       None))
+
+    def _iter_sibling_paths(self, item):
+        """Iterate (item, model path) pairs of :meth:`_iter_siblings`."""
+        path = self.model.get_path(self._iter_for(item))
+        siblings = self._child_items(self._parent_of(item))
+        stack = [(path[:-1], enumerate(itertools.islice(siblings, path[-1],
+                                                        None), path[-1]))]
+        while stack:
+            parent_path, children = stack[-1]
+            for i, child in children:
+                child_path = parent_path + (i, )
+                yield child, child_path
+                grandchildren = self._child_items(child)
+                if grandchildren:
+                    stack.append((child_path, enumerate(grandchildren)))
+                break
+            else:
+                stack.pop()
 
     def _iter_children(self, item):
-        yield item
-        if self.item_has_child(item):
-            row = self.model[self._path_for(item)]
-            for i in row.iterchildren():
-                for c in self._get_children(i[0]):
-                    yield c
+        """Iterate an item and its descendants, depth first."""
+        return self._iter_descendants([item])
 
     def _get_children(self, item):
-        return [c for c in self._iter_children(item)]
+        return list(self._iter_children(item))
+
+    def index(self, item):
+        """Position of an item when iterating the tree
+
+        :param item: The item to find.
+        :raises ValueError: If the item is not present in the tree.
+        """
+        if item in self:
+            for i, item_i in enumerate(self):
+                if item_i is item:
+                    return i
+        raise ValueError('objecttree.index(item) failed, item not in tree')
 
     def _get_selected_items(self):
-        selected_items = super(ObjectTree, self)._get_selected_items()
-        all_items = []
-        for item in selected_items:
-            if self.item_expanded(item):
-                all_items.append(item)
-            else:
-                all_items += self._get_children(item)
-        return all_items
+        """List of currently selected items, including the descendants of
+        selected collapsed items
+
+        .. versionchanged:: X.X.X
+            Read from :attr:`selected_set`, which is only recomputed after the
+            selection or the tree changed.
+        """
+        if self.selection.get_mode() != gtk.SELECTION_MULTIPLE:
+            raise AttributeError('selected_items only valid for '
+                                 'select_multiple')
+        return list(self.selected_set)
 
     def insert_before(self, sibling, item, select=False):
         self._insert_sibling(self.model.insert_before, sibling, item, select)
@@ -749,12 +1970,17 @@ class ObjectTree(ObjectTreeViewBase):
     def _insert_sibling(self, insert_func, sibling, item, select=False):
         if item in self:
             raise ValueError("item %s already in list" % item)
-        modeliter = insert_func(None, self._iter_for(sibling), (item, ))
-        self._id_to_iter[id(item)] = modeliter
+        if not self._keeps_sorted():
+            modeliter = insert_func(None, self._iter_for(sibling), (item, ))
+            self._id_to_iter[id(item)] = modeliter
+            self._cache_items((item, ))
+        else:
+            parent = self.model.iter_parent(self._iter_for(sibling))
+            self._insert_row(parent, -1, item)
         item_path = self._view_path_for(item)
         if select:
             self.selected_item = item
-        self.emit('item-inserted', item, item_path)
+        self._emit_item_signal('item-inserted', item, item_path)
 
     def insert(self, parent, position, item, select=False):
         """Insert an item at the specified position in the list.
@@ -765,22 +1991,50 @@ class ObjectTree(ObjectTreeViewBase):
         """
         if item in self:
             raise ValueError("item %s already in list" % item)
-        modeliter = self.model.insert(parent, position, (item,))
-        self._id_to_iter[id(item)] = modeliter
+        modeliter = self._insert_row(parent, position, item)
         if select:
             self.selected_item = item
         item_path = self._view_path_for(item)
-        self.emit('item-inserted', item, item_path)
+        self._emit_item_signal('item-inserted', item, item_path)
         return modeliter
 
     def insert_subtree(self, parent_iter, position, subtree):
-        # Disable selection-changed handler for insert
-        self.selection.handler_block(self.selection_connect)
+        """Insert the items of a subtree
+
+        The rows are added in a single pass with the selection handler
+        blocked (the view stays attached, so expanded rows and the scroll
+        position are kept), and ``subtree-inserted`` is emitted with the
+        list of inserted items.  If the tree was sorted with :meth:`sort_by`,
+        the children of the parent are sorted again.
+
+        :param parent_iter: Iter of the parent row, or `None` for top-level
+                            items
+        :param position: Position of the (first) top-level item of the
+                         subtree among the children of the parent
+        :param subtree: A :class:`SubObjectTree`
+        :returns: The inserted subtree
+        :raises ValueError: If an item is already in the tree (in which case
+                            no items are inserted).
+
+        .. versionchanged:: X.X.X
+            Emit a single ``subtree-inserted`` instead of ``item-inserted``
+            for each item.
+        """
+        items = list(subtree.items)
+        inserted = set()
+        for item in items:
+            if item in self or id(item) in inserted:
+                raise ValueError("item %s already in list" % item)
+            inserted.add(id(item))
         node_tree = get_node_tree(subtree)
-        self._insert_subtree(parent_iter, node_tree.root, position=position)
-        new_subtree = self.get_subtree(subtree.items)
-        self.selection.handler_unblock(self.selection_connect)
-        return new_subtree
+        with self._rows_changing():
+            self._insert_subtree(parent_iter, node_tree.root,
+                                 position=position)
+            self._cache_items(items)
+            if self._keeps_sorted():
+                self._sort_model(parent_iter)
+        self._emit_item_signal('subtree-inserted', items)
+        return self.get_subtree(subtree.items)
 
     def insert_subtree_before(self, subtree, item=None):
         return self._insert_subtree_relative(subtree, item, before=True)
@@ -804,12 +2058,23 @@ class ObjectTree(ObjectTreeViewBase):
         return self.insert_subtree(parent_iter, position, subtree)
 
     def _insert_subtree(self, parent_iter, parent_node, position=None):
+        model = self.model
+        id_to_iter = self._id_to_iter
         if position is None:
-            position = self.model.iter_n_children(parent_iter)
-
-        for child in parent_node.children[::-1]:
-            child_iter = self.insert(parent_iter, position, child.item)
-            self._insert_subtree(child_iter, child)
+            position = model.iter_n_children(parent_iter)
+        # The top-level nodes are inserted at the position, and their
+        # descendants are appended to the new rows.
+        stack = []
+        for i, node in enumerate(parent_node.children):
+            giter = id_to_iter[id(node.item)] = \
+                model.insert(parent_iter, position + i, (node.item, ))
+            stack.append((giter, node))
+        while stack:
+            giter, node = stack.pop()
+            for child in node.children:
+                child_iter = id_to_iter[id(child.item)] = \
+                    model.append(giter, (child.item, ))
+                stack.append((child_iter, child))
 
     def remove(self, item):
         """Remove an item from the list
@@ -822,23 +2087,23 @@ class ObjectTree(ObjectTreeViewBase):
         item_path = self._view_path_for(item)
         giter = self._iter_for(item)
         del self[giter]
-        self.emit('item-removed', item, item_path)
+        self._emit_item_signal('item-removed', item, item_path)
 
     def is_subtree(self, items):
         if not items:
             return True
         siblings_iter = self._iter_siblings(items[0])
-        contiguous_check = (items == [i for i in
-                                      itertools.islice(siblings_iter,
-                                                       len(items))])
+        contiguous_check = (items == list(itertools.islice(siblings_iter,
+                                                           len(items))))
         try:
             next_item = siblings_iter.next()
-            if len(self._path_for(next_item)) <= len(self._path_for(items[0])):
-                complete_check = True
-            else:
-                complete_check = False
         except StopIteration:
             complete_check = True
+        else:
+            # The subtree is complete unless the next item is a descendant.
+            depth = self.model.iter_depth
+            complete_check = (depth(self._iter_for(next_item)) <=
+                              depth(self._iter_for(items[0])))
         return contiguous_check and complete_check
 
     def get_selected_subtree(self, relative=False):
@@ -847,11 +2112,23 @@ class ObjectTree(ObjectTreeViewBase):
     def copy_selected_subtree(self):
         return self.copy_subtree(self.selected_items)
 
-    def copy_subtree(self, items):
+    def copy_subtree(self, items, clone=copy.copy):
+        """Copy a subtree of items
+
+        :param items: The items of a complete subtree, see :meth:`is_subtree`
+        :param clone: A callable returning the copy of an item, see
+                      :meth:`SubObjectTree.copy`
+        :returns: A :class:`SubObjectTree` with paths relative to the first
+                  item, or `None` if there are no items
+
+        .. versionchanged:: X.X.X
+            Copy items with `clone` (a shallow copy by default) rather than
+            deep copying the subtree.
+        """
         subtree = self.get_subtree(items, relative=True)
         if subtree is None:
             return None
-        return subtree.copy()
+        return subtree.copy(clone)
 
     def get_subtree(self, items, relative=False):
         if not items:
@@ -862,7 +2139,11 @@ class ObjectTree(ObjectTreeViewBase):
                              'sub-tree.')
 
         items = items[:]
-        item_paths = [self.model.get_path(self._iter_for(i)) for i in items]
+        # The items are contiguous, so their paths follow the walk from the
+        # first item.
+        item_paths = [path for item, path in
+                      itertools.islice(self._iter_sibling_paths(items[0]),
+                                       len(items))]
 
         if relative:
             # Normalize item paths to root path (0, )
@@ -878,29 +2159,70 @@ class ObjectTree(ObjectTreeViewBase):
         return SubObjectTree(items, item_paths)
 
     def remove_items(self, items):
-        # Get items sorted by model path
-        sorted_items = zip(*sorted([(self.model.get_path(self.item_iter(i)), i)
-                                    for i in items]))[1]
+        """Remove items (and their descendants) from the tree
 
-        # Delete items in reverse order to ensure all children are
-        # removed before removing the corresponding parent.
-        for item in sorted_items[::-1]:
-            self.remove(item)
+        The rows are removed with the selection handler blocked (the view
+        stays attached, so expanded rows and the scroll position are kept),
+        and ``subtree-removed`` is emitted with the list of removed items, in
+        model order.
+
+        :param items: The items to remove.
+        :raises ValueError: If an item is not present in the tree (in which
+                            case no items are removed).
+
+        .. versionchanged:: X.X.X
+            Emit a single ``subtree-removed`` instead of ``item-removed`` for
+            each item.
+        """
+        model = self.model
+        item_ids = set()
+        for item in items:
+            if item not in self:
+                raise ValueError('objectlist.remove_items(items) failed, '
+                                 'item not in list')
+            item_ids.add(id(item))
+        # Only remove the items whose ancestors are not removed.
+        roots = {}
+        for item in items:
+            giter = model.iter_parent(self._iter_for(item))
+            while giter is not None:
+                if id(model.get_value(giter, 0)) in item_ids:
+                    break
+                giter = model.iter_parent(giter)
+            else:
+                roots[id(item)] = model.get_path(self._iter_for(item)), item
+        roots = sorted(roots.values())
+        removed = list(self._iter_descendants([item for path, item in roots]))
+        with self._rows_changing():
+            for path, item in roots:
+                del self[self._iter_for(item)]
+        self._emit_item_signal('subtree-removed', removed)
 
     def cut_selected_subtree(self):
         return self.cut_subtree(self.selected_items)
 
     def cut_subtree(self, items):
-        subtree = self.copy_subtree(items)
-        self.remove_items(items)
+        """Remove a subtree of items
+
+        :returns: A :class:`SubObjectTree` of the removed items (not copies),
+                  with paths relative to the first item
+
+        .. versionchanged:: X.X.X
+            Return the removed items rather than copies.
+        """
+        subtree = self.get_subtree(items, relative=True)
+        if subtree is not None:
+            self.remove_items(items)
         return subtree
 
     def __iter__(self):
-        """Iterable
+        """Iterate all the items of the tree, depth first
+
+        .. versionchanged:: X.X.X
+            Iterate in model order, including items hidden by the visible
+            function.
         """
-        if self:
-            for item in self._iter_siblings(self[0]):
-                yield item
+        return self._iter_descendants(self._child_items())
 
     selected_items = property(
             fget=_get_selected_items,
@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+
+"""
+    pygtkhelpers.ui.objectlist.virtual
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Object lists backed by data sources whose items are only materialized when
+    they are displayed.
+
+    A data source is any object implementing ``len(source)`` and
+    ``source.item_at(index)``.  Sources may also implement
+    ``source.index(item)`` to look up items that are no longer cached, and
+    ``source.changed()``, which is called when the list is refreshed.
+
+    :copyright: 2005-2008 by pygtkhelpers Authors
+    :license: LGPL 2 or later (see README/COPYING/LICENSE)
+"""
+from array import array
+
+import gobject
+import gtk
+
+from .cache import GenerationalCache
+from .view import ObjectTreeViewBase, sort_direction
+
+_MISSING = object()
+
+
+class SequenceSource(object):
+    """Data source for a Python sequence.
+
+    :param items: The sequence of items.
+    """
+    def __init__(self, items):
+        self.items = items
+        # id(item) -> position, built on the first lookup
+        self._positions = None
+        # Length of the sequence when the table was built
+        self._length = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def item_at(self, index):
+        return self.items[index]
+
+    def index(self, item):
+        """Identity based position of an item in the sequence
+
+        Positions are looked up in a table of the items, which is rebuilt
+        when the table is found to be out of date: if the length of the
+        sequence changed, or an item is no longer at its position in the
+        table.  Call :meth:`changed` after replacing items in place.
+
+        :raises ValueError: If the item is not in the sequence.
+        """
+        items = self.items
+        if self._positions is not None:
+            i = self._positions.get(id(item))
+            if i is not None and i < len(items) and items[i] is item:
+                return i
+            if i is None and len(items) == self._length:
+                raise ValueError('item not in source')
+        self._positions = dict((id(item_i), i)
+                               for i, item_i in enumerate(items))
+        self._length = len(items)
+        i = self._positions.get(id(item))
+        if i is None:
+            raise ValueError('item not in source')
+        return i
+
+    def changed(self):
+        """Rebuild the table of positions on the next lookup."""
+        self._positions = None
+
+
+class IndexedListModel(gtk.GenericTreeModel):
+    """Abstract flat `gtk.GenericTreeModel` addressing rows by index.
+
+    Row references are the integer row indexes.  Subclasses must implement
+    :meth:`row_count`, :meth:`on_get_n_columns`, :meth:`on_get_column_type`
+    and :meth:`on_get_value`.
+    """
+    def __init__(self):
+        gtk.GenericTreeModel.__init__(self)
+        # GTK only stores a pointer to each row reference, and iters may be
+        # kept indefinitely (e.g., by the selection, or by the iters of a
+        # filter or sort model), so the int object of each row used is kept
+        # alive for the lifetime of the model (rather than leaking a
+        # reference for every iter created).
+        self.props.leak_references = False
+        self._rowrefs = {}
+
+    def row_count(self):
+        """Number of rows in the model."""
+        raise NotImplementedError
+
+    def reset_rows(self):
+        """Invalidate all iters, e.g., after the rows have been reordered.
+
+        The view should be detached from the model while rows change.
+        """
+        self.invalidate_iters()
+
+    def _rowref(self, index):
+        return self._rowrefs.setdefault(index, index)
+
+    def on_get_flags(self):
+        return gtk.TREE_MODEL_LIST_ONLY
+
+    def on_get_iter(self, path):
+        if path[0] < self.row_count():
+            return self._rowref(path[0])
+
+    def on_get_path(self, rowref):
+        return (rowref, )
+
+    def on_iter_next(self, rowref):
+        if rowref + 1 < self.row_count():
+            return self._rowref(rowref + 1)
+
+    def on_iter_children(self, parent):
+        if parent is None and self.row_count():
+            return self._rowref(0)
+
+    def on_iter_has_child(self, rowref):
+        return False
+
+    def on_iter_n_children(self, rowref):
+        if rowref is None:
+            return self.row_count()
+        return 0
+
+    def on_iter_nth_child(self, parent, n):
+        if parent is None and 0 <= n < self.row_count():
+            return self._rowref(n)
+
+    def on_iter_parent(self, child):
+        return None
+
+
+class VirtualListModel(IndexedListModel):
+    """Single column list model reading items from a data source on demand.
+
+    Only the items of rows that are accessed are materialized, and at most
+    `cache_size` of them are kept.  Rows may be shown in a different order
+    (or a subset of the source) using :meth:`set_order`.
+
+    :param source: The data source
+    :param cache_size: Maximum number of materialized items to keep
+    """
+    def __init__(self, source, cache_size=1024):
+        IndexedListModel.__init__(self)
+        self.source = source
+        self._cache = GenerationalCache(cache_size, self._on_evict)
+        # id(item) -> source index, for cached items only
+        self._ids = {}
+        self._order = None
+        self._rows = None
+        self._length = len(source)
+
+    def row_count(self):
+        if self._order is None:
+            return self._length
+        return len(self._order)
+
+    def reset(self):
+        """Forget cached items and reread the length of the source.
+
+        Any order set with :meth:`set_order` is dropped.
+        """
+        self._cache.clear()
+        self._ids.clear()
+        self._order = self._rows = None
+        self._length = len(self.source)
+        self.reset_rows()
+
+    def set_order(self, order):
+        """Set the source indexes shown by the model rows.
+
+        :param order: Sequence of source indexes (one per row), or `None` to
+                      show every source item in source order.
+        """
+        if order is None:
+            self._order = self._rows = None
+        else:
+            self._order = array('l', order)
+            # source index -> row (-1 for items that are not shown)
+            self._rows = array('l', [-1]) * self._length
+            for row, index in enumerate(self._order):
+                self._rows[index] = row
+        self.reset_rows()
+
+    def source_item(self, index):
+        """The item at a position in the data source."""
+        item = self._cache.get(index, _MISSING)
+        if item is _MISSING:
+            item = self.source.item_at(index)
+            self._cache[index] = item
+            self._ids[id(item)] = index
+        return item
+
+    def item_at(self, row):
+        """The item shown in a row."""
+        if self._order is not None:
+            row = self._order[row]
+        return self.source_item(row)
+
+    def source_index_for(self, item):
+        """Position of an item in the data source, or `None`."""
+        index = self._ids.get(id(item))
+        if index is None and hasattr(self.source, 'index'):
+            try:
+                index = self.source.index(item)
+            except ValueError:
+                pass
+        return index
+
+    def row_for(self, item):
+        """Row showing an item, or `None` if it is not shown."""
+        index = self.source_index_for(item)
+        if index is None or self._rows is None:
+            return index
+        row = self._rows[index]
+        if row >= 0:
+            return row
+
+    def _on_evict(self, index, item):
+        if self._ids.get(id(item)) == index:
+            del self._ids[id(item)]
+
+    def on_get_n_columns(self):
+        return 1
+
+    def on_get_column_type(self, index):
+        return gobject.TYPE_PYOBJECT
+
+    def on_get_value(self, rowref, column):
+        return self.item_at(rowref)
+
+
+class VirtualObjectList(ObjectTreeViewBase):
+    """An object list showing the items of a data source
+
+    Items are only read from the source when their rows are displayed, so
+    memory use is proportional to the visible part of the list rather than to
+    the number of items.
+
+    Filtering (:meth:`set_visible_func`) and sorting (:meth:`sort_by`) are
+    applied by the model in a single pass over the source.  After the source
+    has changed, call :meth:`refresh`.
+
+    :param columns: A list of Column instances
+    :param source: A data source, or a sequence of items
+    :param cache_size: Maximum number of materialized items to keep
+
+    .. versionadded:: X.X.X
+    """
+
+    __gtype_name__ = "PyGTKHelpersVirtualObjectList"
+
+    #: Width of columns that do not specify one (all columns must have a
+    #: fixed width for fixed height mode).
+    default_column_width = 100
+
+    def __init__(self, columns=(), source=(), cache_size=1024, **kwargs):
+        if not hasattr(source, 'item_at'):
+            source = SequenceSource(source)
+        self.source = source
+        self.cache_size = cache_size
+        self._sort_spec = None
+        # Columns are sorted through sort_by(), not by a sort model.
+        kwargs['sortable'] = False
+        ObjectTreeViewBase.__init__(self, columns, **kwargs)
+
+    def create_model(self):
+        return VirtualListModel(self.source, self.cache_size)
+
+    def _build_model_chain(self):
+        # Filtering and sorting are done by the virtual model itself.
+        self.model_filter = self.model_sort = self.model_tree = self.model
+
+    def _detach_model(self):
+        selected = self._hold_selection()
+        self.set_model(None)
+        return selected
+
+    def _attach_model(self, selected):
+        self.set_model(self.model)
+        self._restore_selection(selected)
+
+    def set_columns(self, columns):
+        ObjectTreeViewBase.set_columns(self, columns)
+        # In fixed height mode the view does not measure every row, which
+        # would materialize every item.
+        for view_col in self.get_columns():
+            if view_col.get_sizing() != gtk.TREE_VIEW_COLUMN_FIXED:
+                view_col.set_sizing(gtk.TREE_VIEW_COLUMN_FIXED)
+                view_col.set_fixed_width(self.default_column_width)
+        self.set_fixed_height_mode(True)
+
+    def __len__(self):
+        """Number of items in the data source
+        """
+        return len(self.source)
+
+    def __contains__(self, item):
+        """Identity based check of membership
+
+        :param item: The item to check membership for
+        """
+        return self.model.source_index_for(item) is not None
+
+    def __iter__(self):
+        """Iterate the items of the data source
+        """
+        for index in xrange(len(self.source)):
+            yield self.source.item_at(index)
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('the items of a VirtualObjectList are read from its '
+                        'data source; change the source and call refresh()')
+
+    clear = __delitem__ = move_item_up = move_item_down = _read_only
+
+    def __getitem__(self, index):
+        # index can be a position in the source or an iter
+        if isinstance(index, gtk.TreeIter):
+            return self._object_at_iter(index)
+        return self.model.source_item(index)
+
+    def index(self, item):
+        """Position of an item in the data source
+
+        :raises ValueError: If the item is not in the data source.
+        """
+        index = self.model.source_index_for(item)
+        if index is None:
+            raise ValueError('objectlist.index(item) failed, item not in '
+                             'source')
+        return index
+
+    def index_in_view(self, item):
+        """Row showing an item, or `None` if the item is filtered out
+
+        :raises ValueError: If the item is not in the data source.
+        """
+        self.index(item)
+        return self.model.row_for(item)
+
+    def _iter_for(self, obj):
+        row = self.model.row_for(obj)
+        if row is None:
+            raise KeyError(id(obj))
+        return self.model.get_iter((row, ))
+
+    _view_iter_for = _iter_for
+    _sort_iter_for = _iter_for
+
+    def _update_items(self, items):
+        # The visible function and sort order are not reapplied, see
+        # refresh().
+        model = self.model
+        for item in items:
+            self._discard_cached(item)
+            row = model.row_for(item)
+            if row is not None:
+                model.row_changed((row, ), model.get_iter((row, )))
+
+    def refresh(self):
+        """Reload the list after the data source has changed
+
+        Cached items are dropped, and the visible function and sort order are
+        reapplied.
+        """
+        state = self._detach_model()
+        for cache in self._caches.itervalues():
+            cache.clear()
+        changed = getattr(self.source, 'changed', None)
+        if changed is not None:
+            changed()
+        self.model.reset()
+        self.model.set_order(self._compute_order())
+        self._attach_model(state)
+
+    def set_visible_func(self, visible_func, change=None):
+        """Set the function to decide visibility of an item
+
+        :param visible_func: A callable that returns a boolean result to
+                             decide if an item should be visible
+        :param change: `narrow` if the new function can only hide visible
+                       items, so that only the visible items are evaluated;
+                       otherwise all items are evaluated.
+        """
+        if change not in (None, 'narrow', 'widen'):
+            raise ValueError('change must be None, "narrow" or "widen", '
+                             'not %r' % (change, ))
+        self._visible_func = visible_func
+        if change == 'narrow':
+            model = self.model
+            shown = model._order
+            if shown is None:
+                shown = xrange(model.row_count())
+            order = [index for index in shown
+                     if visible_func(model.source_item(index))]
+            state = self._detach_model()
+            model.set_order(order)
+            self._attach_model(state)
+        else:
+            self._apply_order()
+
+    def item_visible(self, item):
+        """Return whether an item is shown
+        """
+        return self.model.row_for(item) is not None
+
+    @property
+    def visible_count(self):
+        """Number of items shown"""
+        return self.model.row_count()
+
+    @property
+    def hidden_count(self):
+        """Number of items filtered out"""
+        return len(self.source) - self.model.row_count()
+
+    def sort_by(self, attr_or_key, direction='asc'):
+        """Sort the view by an attribute or key
+
+        :param attr_or_key: The attribute or key to sort by
+        :param direction: Either `asc` or `desc` indicating the direction of
+                          sorting
+        """
+        direction = sort_direction(direction)
+        if callable(attr_or_key):
+            key = attr_or_key
+        else:
+            def key(item, attr=attr_or_key):
+                return getattr(item, attr, None)
+        self._sort_spec = key, direction == gtk.SORT_DESCENDING
+        self._apply_order()
+
+    def _apply_order(self):
+        state = self._detach_model()
+        self.model.set_order(self._compute_order())
+        self._attach_model(state)
+
+    def _compute_order(self):
+        # Source indexes of the visible items, in display order (or `None` to
+        # show all items in source order).
+        visible_func = self.__dict__.get('_visible_func')
+        if visible_func is None and self._sort_spec is None:
+            return None
+        source = self.source
+        if self._sort_spec is None:
+            return [index for index in xrange(len(source))
+                    if visible_func(source.item_at(index))]
+        key, reverse = self._sort_spec
+        keyed = []
+        for index in xrange(len(source)):
+            item = source.item_at(index)
+            if visible_func is None or visible_func(item):
+                keyed.append((key(item), index))
+        keyed.sort(key=lambda key_index: key_index[0], reverse=reverse)
+        return [index for key_i, index in keyed]
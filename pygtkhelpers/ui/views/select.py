@@ -1,6 +1,9 @@
+import numpy as np
+
+from ...utils import gsignal
 from ...delegates import SlaveView
-from ..objectlist import (get_list_store, add_columns,
-                          on_edited_dataframe_sync)
+from ..objectlist import (get_list_store, get_frame_model, add_columns,
+                          on_edited_dataframe_sync, DataFrameTreeModel)
 
 
 class ListSelect(SlaveView):
@@ -9,9 +12,26 @@ class ListSelect(SlaveView):
         Specify :attr:`builder_file` instead of :attr:`builder_path` to support
         loading ``.glade`` file from ``.zip`` files (e.g., in app packaged with
         Py2Exe).
+
+    .. versionchanged:: X.X.X
+        Add :attr:`frame_model`, :meth:`set_mask`, :meth:`select_where` and
+        the ``selection-changed`` signal.
     '''
+    # Emit signal when rows were selected or deselected (positions of the
+    # changed rows).
+    gsignal('selection-changed', object)
+
     builder_file = 'list_select.glade'
 
+    #: Whether the tree view shows the data frame through a
+    #: `DataFrameTreeModel`, rather than a copy of the data in a
+    #: `gtk.ListStore`.
+    frame_model = False
+
+    #: Minimum number of changed rows for which :meth:`set_mask` detaches the
+    #: tree view from a `gtk.ListStore` model while updating it.
+    detach_threshold = 100
+
     def __init__(self, df_data=None):
         self.df_data = df_data
         super(ListSelect, self).__init__()
@@ -34,7 +54,10 @@ class ListSelect(SlaveView):
         for column in self.treeview_select.get_columns():
             self.treeview_select.remove_column(column)
 
-        self.df_py_dtypes, self.list_store = get_list_store(df_data)
+        if self.frame_model:
+            self.df_py_dtypes, self.list_store = get_frame_model(df_data)
+        else:
+            self.df_py_dtypes, self.list_store = get_list_store(df_data)
         add_columns(self.treeview_select, self.df_py_dtypes, self.list_store)
 
         # Keep selected state in `select` data frame column synced with UI.
@@ -43,15 +66,76 @@ class ListSelect(SlaveView):
         cell = select_column.get_cell_renderers()[0]
         cell.connect('toggled', on_edited_dataframe_sync, None, select_column,
                      self.df_py_dtypes, self.list_store, self.df_data)
+        cell.connect('toggled', lambda cell, path:
+                     self.emit('selection-changed', np.array([int(path)])))
 
-    def set_all(self, value):
+    def set_mask(self, mask):
+        '''
+        Select the rows where `mask` is `True`, and deselect the others.
+
+        Only the rows whose selection changed are updated in the model (with
+        the tree view detached from a `gtk.ListStore` model if at least
+        :attr:`detach_threshold` rows changed), and a single
+        ``selection-changed`` signal is emitted, if any row changed.
+
+        Args:
+
+            mask (numpy.ndarray) : Boolean array with one value per row.
+
+        Returns:
+
+            (numpy.ndarray) : Positions of the rows whose selection changed.
+        '''
+        mask = np.asarray(mask, dtype=bool)
         column_i = self.df_py_dtypes.ix[self.select_column].i
-        select_column = self.treeview_select.get_column(column_i).get_name()
+        selected = self.df_data[self.select_column].values
+        if mask.shape != selected.shape:
+            raise ValueError('Mask has %d values, expected %d.' %
+                             (mask.size, selected.size))
+        changed = np.flatnonzero(selected != mask)
+        if not changed.size:
+            return changed
+        # Write in place, so a `DataFrameTreeModel` keeps reading the column.
+        selected[changed] = mask[changed]
+        if isinstance(self.list_store, DataFrameTreeModel):
+            self.list_store.frame_changed(rows=changed,
+                                          columns=[self.select_column])
+        elif changed.size < self.detach_threshold:
+            self._set_rows(changed, mask, column_i)
+        else:
+            self.treeview_select.set_model(None)
+            try:
+                self._set_rows(changed, mask, column_i)
+            finally:
+                self.treeview_select.set_model(self.list_store)
+        self.emit('selection-changed', changed)
+        return changed
 
-        self.df_data.loc[:, select_column] = value
-        for i in xrange(len(self.list_store)):
+    def _set_rows(self, changed, mask, column_i):
+        for i, value in zip(changed.tolist(), mask[changed].tolist()):
             self.list_store[i][column_i] = value
 
+    def select_where(self, query):
+        '''
+        Select the rows matching a query, and deselect the others.
+
+        Args:
+
+            query (str) : Boolean expression evaluated by
+                `pandas.DataFrame.eval` against :attr:`df_data` (e.g.,
+                `'value > 5 and name != "foo"'`).
+
+        Returns:
+
+            (numpy.ndarray) : Positions of the rows whose selection changed.
+        '''
+        return self.set_mask(self.df_data.eval(query).values)
+
+    def set_all(self, value):
+        mask = np.empty(len(self.df_data), dtype=bool)
+        mask.fill(value)
+        self.set_mask(mask)
+
     def select_none(self):
         self.set_all(False)
 
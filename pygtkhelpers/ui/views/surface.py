@@ -1,10 +1,14 @@
+from collections import OrderedDict
+
+from si_prefix import si_parse
+import gobject
 import gtk
 import pandas as pd
 
 from ...utils import gsignal
 from ...delegates import SlaveView
-from ..objectlist import (get_list_store, add_columns,
-                          on_edited_dataframe_sync, set_column_format)
+from ..objectlist import (get_list_store, get_frame_model, add_columns,
+                          set_column_format, DataFrameTreeModel)
 
 
 class LayerAlphaController(SlaveView):
@@ -13,9 +17,28 @@ class LayerAlphaController(SlaveView):
         Specify :attr:`builder_file` instead of :attr:`builder_path` to support
         loading ``.glade`` file from ``.zip`` files (e.g., in app packaged with
         Py2Exe).
+
+    .. versionchanged:: X.X.X
+        Add :attr:`frame_model`.  Look up layers by name, track reordering
+        with a permutation of the layers (:attr:`df_surfaces` is only built
+        when it is read), and throttle ``alpha-changed`` while the alpha scale
+        is dragged.  Add the ``alphas-changed`` signal.
     '''
+    #: Whether the tree view shows the layers through a `DataFrameTreeModel`
+    #: (reading :attr:`df_surfaces` directly), rather than a copy in a
+    #: `gtk.ListStore`.  Layers cannot be reordered by dragging rows of a
+    #: `DataFrameTreeModel`.
+    frame_model = False
+
+    #: Minimum interval (in milliseconds) between alpha signals while the
+    #: alpha scale is dragged.
+    alpha_signal_interval = 50
+
     # Emit signal when layer alpha has changed (layer name, alpha).
     gsignal('alpha-changed', str, float)
+    # Emit signal once for alpha changes of one or more layers (dictionary
+    # mapping layer names to alphas), after the `alpha-changed` signals.
+    gsignal('alphas-changed', object)
     # Emit signal when order of layers has changed (list of reordered row
     # indices).
     gsignal('layers-reordered', object)
@@ -26,14 +49,16 @@ class LayerAlphaController(SlaveView):
         super(LayerAlphaController, self).create_ui()
         self.treeview_layers.set_reorderable(True)
         self.adjustment_alpha = self._builder.get_object('adjustment_alpha')
+        self._pending_alphas = OrderedDict()
+        self._alpha_source = None
 
     def on_edited(self, cell_renderer, iter, new_value, column, df_py_dtypes,
                   list_store, df_data):
-        if on_edited_dataframe_sync(cell_renderer, iter, new_value, column,
-                                    df_py_dtypes, list_store, df_data):
-            surface_name, alpha = self.df_surfaces.iloc[int(iter)]
-            self.adjustment_alpha.set_value(alpha * 100)
-            self.emit('alpha-changed', surface_name, alpha)
+        surface_name, alpha = list_store[iter]
+        new_alpha = si_parse(new_value)
+        if new_alpha != alpha:
+            self.set_alpha(surface_name, new_alpha)
+            self.adjustment_alpha.set_value(new_alpha * 100)
 
     def on_treeview_layers__cursor_changed(self, treeview):
         # As a workaround for an apparent race condition, use `idle_add`
@@ -53,9 +78,36 @@ class LayerAlphaController(SlaveView):
         else:
             surface_name, alpha = list_store[selected_iter]
         new_alpha = adjustment.get_value() / 100.
+        if new_alpha == alpha:
+            return
 
         #  2. Set alpha in `self.df_surfaces` and `self.list_store`.
-        self.set_alpha(surface_name, new_alpha)
+        self._set_alpha(surface_name, new_alpha)
+
+        #  3. Emit alpha signals at most every `alpha_signal_interval` ms.
+        self._pending_alphas[surface_name] = new_alpha
+        if self._alpha_source is None:
+            self._alpha_source = gobject.timeout_add(
+                self.alpha_signal_interval, self._on_alpha_timeout)
+
+    def _on_alpha_timeout(self):
+        self._alpha_source = None
+        self.flush_alpha_signals()
+        return False
+
+    def flush_alpha_signals(self):
+        '''
+        Emit the alpha signals pending while the alpha scale is dragged.
+        '''
+        if self._alpha_source is not None:
+            gobject.source_remove(self._alpha_source)
+            self._alpha_source = None
+        if not self._pending_alphas:
+            return
+        alphas, self._pending_alphas = self._pending_alphas, OrderedDict()
+        for surface_name, alpha in alphas.iteritems():
+            self.emit('alpha-changed', surface_name, alpha)
+        self.emit('alphas-changed', dict(alphas))
 
     def on_button_show__clicked(self, button):
         self.set_alpha_for_selection(1.)
@@ -79,19 +131,34 @@ class LayerAlphaController(SlaveView):
         '''
         for column in self.treeview_layers.get_columns():
             self.treeview_layers.remove_column(column)
+        self.flush_alpha_signals()
 
-        self.df_surfaces = pd.DataFrame(df_surfaces.index.values,
-                                        columns=[df_surfaces.index.name or
-                                                 'index'],
-                                        index=df_surfaces.index)
+        df_layers = pd.DataFrame(df_surfaces.index.values,
+                                 columns=[df_surfaces.index.name or 'index'],
+                                 index=df_surfaces.index)
 
         if 'alpha' in df_surfaces:
-            self.df_surfaces['alpha'] = df_surfaces.alpha.copy()
+            df_layers['alpha'] = df_surfaces.alpha.copy()
         else:
-            self.df_surfaces['alpha'] = 1.
+            df_layers['alpha'] = 1.
+
+        # Layers in their original order; `_order` lists the original
+        # position of the layer shown in each row.
+        self._index_name = df_surfaces.index.name
+        self._name_column = df_layers.columns[0]
+        self._names = df_surfaces.index.values
+        self._alphas = df_layers.alpha.values.astype(float)
+        self._order = range(len(self._names))
+        self._positions = dict((name, i) for i, name in
+                               enumerate(self._names))
+        self._df_surfaces = df_layers
 
-        self.df_py_dtypes, self.list_store = get_list_store(self.df_surfaces)
+        if self.frame_model:
+            self.df_py_dtypes, self.list_store = get_frame_model(df_layers)
+        else:
+            self.df_py_dtypes, self.list_store = get_list_store(df_layers)
         add_columns(self.treeview_layers, self.df_py_dtypes, self.list_store)
+        self.treeview_layers.set_reorderable(not self.frame_model)
 
         self._inserted_row_path = None
 
@@ -103,19 +170,46 @@ class LayerAlphaController(SlaveView):
         cell_renderer.set_properties(digits=2, editable=True,
                                      adjustment=adjustment)
         cell_renderer.connect('edited', self.on_edited, column,
-                              self.df_py_dtypes, self.list_store,
-                              self.df_surfaces)
+                              self.df_py_dtypes, self.list_store, None)
         set_column_format(column, self.df_py_dtypes.ix['alpha'].i,
                           '{value:.2f}', cell_renderer=cell_renderer)
+        if self.frame_model:
+            return
         # Bind handlers for reordering of surface layers.
         for k in ('inserted', 'deleted'):
             self.list_store.connect('row-' + k, getattr(self, 'on_row_' + k))
 
+    @property
+    def df_surfaces(self):
+        '''
+        Data frame of the layers in the order shown, indexed by layer name,
+        with the alpha of each layer.
+
+        .. versionchanged:: X.X.X
+            Built from the layer order and alphas when read after they
+            changed.  Assigning a data frame calls :meth:`set_surfaces`.
+        '''
+        if isinstance(self.list_store, DataFrameTreeModel):
+            # Layers are not reordered, and the model writes the alphas.
+            return self.list_store.data_frame
+        if self._df_surfaces is None:
+            names = self._names[self._order]
+            self._df_surfaces = \
+                pd.DataFrame({self._name_column: names,
+                              'alpha': self._alphas[self._order]},
+                             columns=[self._name_column, 'alpha'],
+                             index=pd.Index(names, name=self._index_name))
+        return self._df_surfaces
+
+    @df_surfaces.setter
+    def df_surfaces(self, df_surfaces):
+        self.set_surfaces(df_surfaces)
+
     def on_row_inserted(self, list_store, row_path, row_iter):
         self._inserted_row_path = row_path[0]
 
     def on_row_deleted(self, list_store, row_path):
-        rows_index = range(self.df_surfaces.shape[0])
+        n_rows = len(self._order)
         if self._inserted_row_path is not None:
             source_index = row_path[0]
             target_index = self._inserted_row_path
@@ -126,10 +220,29 @@ class LayerAlphaController(SlaveView):
         else:
             source_index = row_path[0]
             target_index = None
-        rows_index.remove(source_index)
-        if target_index is not None:
-            rows_index.insert(target_index, source_index)
-        self.df_surfaces = self.df_surfaces.take(rows_index, is_copy=False)
+        self._inserted_row_path = None
+        if target_index is None:
+            moved = self._order.pop(source_index)
+            del self._positions[self._names[moved]]
+            # The rows after the deleted row moved up.
+            first, last = source_index, len(self._order) - 1
+            rows_index = range(source_index) + range(source_index + 1,
+                                                     n_rows)
+        else:
+            first = min(source_index, target_index)
+            last = max(source_index, target_index)
+            # Only the rows between the source and the target moved.
+            moved_rows = range(first, last + 1)
+            if source_index < target_index:
+                moved_rows.append(moved_rows.pop(0))
+            else:
+                moved_rows.insert(0, moved_rows.pop())
+            self._order[first:last + 1] = [self._order[i]
+                                           for i in moved_rows]
+            rows_index = range(first) + moved_rows + range(last + 1, n_rows)
+        for i in xrange(first, last + 1):
+            self._positions[self._names[self._order[i]]] = i
+        self._df_surfaces = None
         self.emit('layers-reordered', rows_index)
 
     def set_scale_alpha_from_selection(self):
@@ -170,17 +283,22 @@ class LayerAlphaController(SlaveView):
             self.set_scale_alpha_from_selection()
 
     def set_alpha(self, surface_name, alpha):
-        #  1. Set alpha in `self.df_surfaces`.
-        self.df_surfaces.loc[surface_name, 'alpha'] = alpha
-
-        #  2. Set alpha in list store model.
-        store_name_column_index = self.df_py_dtypes.iloc[0].i
-        store_alpha_column_index = self.df_py_dtypes.ix['alpha'].i
-
-        for row in self.list_store:
-            if row[store_name_column_index] == surface_name:
-                row[store_alpha_column_index] = alpha
-                break
+        #  1. Set alpha in `self.df_surfaces` and list store model.
+        self._set_alpha(surface_name, alpha)
 
-        #  3. Emit `alpha-changed`.
+        #  2. Emit `alpha-changed` (and `alphas-changed`).
+        self._pending_alphas.pop(surface_name, None)
         self.emit('alpha-changed', surface_name, alpha)
+        self.emit('alphas-changed', {surface_name: alpha})
+
+    def _set_alpha(self, surface_name, alpha):
+        position = self._positions[surface_name]
+        store_alpha_column_index = self.df_py_dtypes.ix['alpha'].i
+        if isinstance(self.list_store, DataFrameTreeModel):
+            self.list_store.set_value(self.list_store.get_iter((position, )),
+                                      store_alpha_column_index, alpha)
+        else:
+            self._alphas[self._order[position]] = alpha
+            if self._df_surfaces is not None:
+                self._df_surfaces.iat[position, 1] = alpha
+            self.list_store[position][store_alpha_column_index] = alpha
@@ -1,6 +1,10 @@
+import cPickle
+import zlib
+
 import py
 import gtk
 from pygtkhelpers.utils import refresh_gui
+from pygtkhelpers.ui.objectlist import SubObjectTree
 from .conftest import User
 
 from pygtkhelpers.test import CheckCalled
@@ -147,6 +151,23 @@ def test_move_last_subitem_up(items, user, user2, user3):
     assert (items._path_for(user3) ==
             items._path_for_iter(items._next_iter_for(user2)))
 
+@py.test.mark.tree_only
+def test_tree_iter(items, user, user2, user3):
+    user4 = User(name='Gnome', age=7)
+    items.append(user)
+    items.append(user2, parent=user)
+    items.append(user3)
+    items.insert_before(user2, user4)
+    assert list(items) == [user, user4, user2, user3]
+    assert items.is_subtree([user, user4, user2])
+    assert not items.is_subtree([user, user4])
+    assert items.get_subtree([user4, user2]).item_paths == [(0, 0), (0, 1)]
+    items.move_item_down(user)
+    assert list(items) == [user3, user, user4, user2]
+    items.remove(user)
+    assert list(items) == [user3]
+    assert user2 not in items
+
 def test_view_iters(items, user, user2, user3):
     items.extend([user, user2, user3])
     items.set_visible_func(lambda obj: obj.age<100)
@@ -154,6 +175,71 @@ def test_view_iters(items, user, user2, user3):
     assert items.item_visible(user)
     assert not items.item_visible(user3)
 
+def test_visible_func_narrow_widen(items, user, user2, user3):
+    items.extend([user, user2, user3])
+    checked = []
+    def younger_than(age):
+        def visible(obj):
+            checked.append(obj)
+            return obj.age < age
+        return visible
+    items.set_visible_func(younger_than(100))
+    assert items.visible_count == 2
+    assert items.hidden_count == 1
+    del checked[:]
+    items.set_visible_func(younger_than(11), change='narrow')
+    assert sorted(checked) == sorted([user, user2])
+    assert not items.item_visible(user2)
+    assert items.visible_count == 1
+    del checked[:]
+    items.set_visible_func(younger_than(1000), change='widen')
+    assert sorted(checked) == sorted([user2, user3])
+    assert items.visible_count == 3
+    py.test.raises(ValueError, items.set_visible_func, younger_than(1),
+                   change='shrink')
+
+def test_visible_func_update(items, user, user2):
+    items.extend([user, user2])
+    items.set_visible_func(lambda obj: obj.age < 11)
+    assert items.hidden_count == 1
+    user2.age = 5
+    items.update(user2)
+    assert items.item_visible(user2)
+    assert items.hidden_count == 0
+
+def test_update_many(items, user, user2, user3):
+    items.extend([user, user2, user3])
+    items.set_visible_func(lambda obj: obj.age < 100)
+    user.age = user2.age = 200
+    items.update_many([user, user2])
+    assert items.visible_count == 0
+
+def test_update_hidden_view(items, user, user2):
+    items.extend([user, user2])
+    changed = []
+    items.model.connect('row-changed',
+                        lambda model, path, giter: changed.append(path))
+    # The view is not realized, but listeners of the model are still
+    # told about the update.
+    items.update_many([user2, user])
+    assert changed == [(1, ), (0, )]
+
+def test_coalesce_updates(items, user, user2):
+    items.extend([user, user2])
+    items.set_visible_func(lambda obj: obj.age < 100)
+    items.coalesce_updates = True
+    user.age = 200
+    items.update(user)
+    items.update(user)
+    assert items.item_visible(user)
+    refresh_gui()
+    assert not items.item_visible(user)
+    user2.age = 200
+    items.update(user2)
+    items.remove(user2)
+    items.flush_updates()
+    assert items.visible_count == 0
+
 def test_item_after(items, user, user2, user3):
     items.extend([user, user2, user3])
     assert items.item_after(user) is user2
@@ -166,3 +252,284 @@ def test_item_before(items, user, user2, user3):
     assert items.item_before(user3) is user2
     assert items.item_before(user) is None
 
+
+@py.test.mark.list_only
+def test_extend_bulk(items, user, user2, user3):
+    items.bulk_threshold = 2
+    item_added = CheckCalled(items, 'item-added')
+    items_added = CheckCalled(items, 'items-added')
+    items.extend([user, user2, user3])
+    assert list(items) == [user, user2, user3]
+    assert user3 in items
+    assert item_added.called_count == 3
+    assert items_added.called_count == 1
+    assert items_added.called[1] == [user, user2, user3]
+
+@py.test.mark.list_only
+def test_extend_bulk_duplicate(items, user, user2):
+    items.bulk_threshold = 2
+    items.append(user)
+    py.test.raises(ValueError, items.extend, [user2, user])
+    assert list(items) == [user]
+
+@py.test.mark.list_only
+def test_extend_bulk_keeps_selection(items, user, user2, user3):
+    items.bulk_threshold = 2
+    items.append(user, select=True)
+    items.extend([user2, user3])
+    assert items.selected_item is user
+
+def test_batch(items, user, user2, user3):
+    items.append(user)
+    item_added = CheckCalled(items, 'item-added')
+    item_removed = CheckCalled(items, 'item-removed')
+    batch_finished = CheckCalled(items, 'batch-finished')
+    with items.batch():
+        items.append(user2)
+        with items.batch():
+            items.append(user3, select=True)
+        items.remove(user)
+        assert not item_added.called
+        assert not batch_finished.called
+    assert list(items) == [user2, user3]
+    assert item_added.called_count == 2
+    assert item_removed.called_count == 1
+    assert batch_finished.called_count == 1
+    assert batch_finished.called[1:] == ([user2, user3], [user])
+    assert items.selected_item is user3
+
+@py.test.mark.list_only
+def test_batch_sorted(items, user, user2, user3):
+    items.sort_by('name')
+    item_added = CheckCalled(items, 'item-added')
+    with items.batch(item_signals=False):
+        items.extend([user3, user])
+        items.append(user2)
+    assert list(items) == [user2, user, user3]
+    assert not item_added.called
+
+def test_batch_reattaches_on_error(items, user, user2):
+    def key(item):
+        if item is user2:
+            raise KeyError(item.name)
+        return item.name
+    items.append(user)
+    items.sort_by(key)
+    def add():
+        with items.batch():
+            items.append(user2)
+    py.test.raises(KeyError, add)
+    assert items.get_model() is items.model_sort
+    assert items.model_sort is not None
+
+@py.test.mark.list_only
+def test_batch_selected_ids(items, user, user2, user3):
+    items.get_selection().set_mode(gtk.SELECTION_MULTIPLE)
+    items.extend([user, user2])
+    with items.batch():
+        items.append(user3)
+        items.selected_ids = [1, 2]
+    assert items.selected_items == [user2, user3]
+
+@py.test.mark.list_only
+def test_batch_index_in_view(items, user):
+    items.append(user)
+    with items.batch():
+        py.test.raises(RuntimeError, items.index_in_view, user)
+    assert items.index_in_view(user) == 0
+
+def test_batch_scroll_to(items, user, user2):
+    items.append(user)
+    with items.batch():
+        items.append(user2)
+        items.scroll_to(user2)
+        items.scroll_to(user)
+        items.remove(user)
+    assert list(items) == [user2]
+
+@py.test.mark.tree_only
+def test_batch_expand_item(items, user, user2):
+    items.append(user)
+    with items.batch():
+        items.append(user2, user)
+        items.expand_item(user)
+    assert items.item_expanded(user)
+
+@py.test.mark.tree_only
+def test_batch_item_view_iter(items, user, user2):
+    items.append(user)
+    items.append(user2, user)
+    with items.batch():
+        py.test.raises(RuntimeError, items.item_view_iter, user)
+        py.test.raises(RuntimeError, items.item_has_child, user)
+    assert items.item_has_child(user)
+    assert items.model_sort[items.item_view_iter(user)][0] is user
+
+@py.test.mark.list_only
+def test_set_items(items, user, user2, user3):
+    user4 = User(name='Gnome', age=7)
+    items.extend([user, user2, user3])
+    items.selected_item = user2
+    item_removed = CheckCalled(items, 'item-removed')
+    item_inserted = CheckCalled(items, 'item-inserted')
+    items.set_items([user2, user4, user3])
+    assert list(items) == [user2, user4, user3]
+    assert item_removed.called[1:] == (user, 0)
+    assert item_inserted.called[1:] == (user4, 1)
+    assert items.selected_item is user2
+    items.set_items([user3, user, user2])
+    assert list(items) == [user3, user, user2]
+    assert items.index(user2) == 2
+    assert items.selected_item is user2
+    new_user = User(name='Hans', age=11)
+    items.set_items([user3, new_user, user2], key=lambda user: user.name)
+    assert list(items) == [user3, new_user, user2]
+    assert user not in items
+    py.test.raises(ValueError, items.set_items, [user, user])
+
+@py.test.mark.list_only
+def test_set_items_duplicate_keys(items, user, user2, user3):
+    twin = User(name='Hans', age=12)
+    items.extend([user, user2, twin])
+    item_removed = CheckCalled(items, 'item-removed')
+    items.set_items([user3, user2, user], key=lambda user: user.name)
+    # The present items are not unique by name, so all rows are replaced.
+    assert list(items) == [user3, user2, user]
+    assert item_removed.called_count == 3
+    assert items.index(user) == 2
+
+@py.test.mark.list_only
+def test_index(items, user, user2, user3):
+    items.extend([user, user2])
+    assert items.index(user) == 0
+    assert items.index(user2) == 1
+    items.insert(0, user3)
+    assert items.index(user3) == 0
+    assert items.index(user2) == 2
+    items.remove(user)
+    assert items.index(user2) == 1
+    items.move_item_up(user2)
+    assert items.index(user2) == 0
+    py.test.raises(ValueError, items.index, user)
+
+@py.test.mark.list_only
+def test_index_in_view(items, user, user2, user3):
+    items.extend([user, user2, user3])
+    items.sort_by('age', '-')
+    assert items.index_in_view(user3) == 0
+    items.set_visible_func(lambda obj: obj.age < 100)
+    assert items.index_in_view(user3) is None
+
+@py.test.mark.list_only
+def test_selected_id(items, user, user2):
+    items.extend([user, user2])
+    items.selected_item = user2
+    assert items.selected_id == 1
+
+@py.test.mark.tree_only
+def test_insert_remove_subtree(items, user, user2, user3):
+    user4 = User(name='Gnome', age=7)
+    items.append(user)
+    items.append(user2, parent=user)
+    items.append(user3)
+    subtree = items.cut_subtree([user, user2])
+    assert list(items) == [user3]
+    subtree_inserted = CheckCalled(items, 'subtree-inserted')
+    items.insert_subtree(None, 1, subtree)
+    assert subtree_inserted.called[1] == subtree.items
+    assert len(list(items)) == 3
+    new_user = list(items)[1]
+    items.append(user4, parent=new_user)
+    subtree_removed = CheckCalled(items, 'subtree-removed')
+    items.remove_items([user4, new_user])
+    assert subtree_removed.called_count == 1
+    assert subtree_removed.called[1][-1] is user4
+    assert list(items) == [user3]
+
+@py.test.mark.tree_only
+def test_subtree_keeps_view_state(items, user, user2, user3):
+    user4 = User(name='Gnome', age=7)
+    items.get_selection().set_mode(gtk.SELECTION_MULTIPLE)
+    items.append(user)
+    items.append(user2, parent=user)
+    items.append(user3, parent=user)
+    items.expand_item(user)
+    items.selected_items = [user2]
+    selection_changed = CheckCalled(items, 'selection-changed')
+    subtree = SubObjectTree([user4], [(0, )])
+    items.insert_subtree(items._iter_for(user), 2, subtree)
+    assert items.item_expanded(user)
+    assert items.selected_items == [user2]
+    items.remove_items([user3])
+    assert items.item_expanded(user)
+    assert items.selected_items == [user2]
+    assert not selection_changed.called
+    items.remove_items([user2])
+    assert selection_changed.called
+
+@py.test.mark.tree_only
+def test_copy_subtree(items, user, user2):
+    items.append(user)
+    items.append(user2, parent=user)
+    subtree = items.copy_subtree([user, user2])
+    assert subtree.item_paths == [(0, ), (0, 0)]
+    assert subtree.items[0] is not user
+    assert subtree.items[0].name == user.name
+    shared = items.copy_subtree([user, user2], clone=None)
+    assert shared.items == [user, user2]
+    assert shared.items[0] is user
+
+def test_subtree_cow_dumps(user):
+    from pygtkhelpers.ui.objectlist import SubObjectTree, CopyOnWrite
+    subtree = SubObjectTree([user], [(0, )]).copy(CopyOnWrite)
+    cow = subtree.items[0]
+    assert cow.name == 'Hans'
+    cow.name = 'Hansel'
+    assert cow.name == 'Hansel'
+    assert user.name == 'Hans'
+    assert isinstance(cow, User)
+    loaded = SubObjectTree.loads(subtree.dumps(), classes=[User])
+    assert loaded.item_paths == [(0, )]
+    assert loaded.items[0].name == 'Hansel'
+    # Classes that are not listed are not created.
+    py.test.raises(cPickle.UnpicklingError, SubObjectTree.loads,
+                   subtree.dumps())
+    evil = zlib.compress(cPickle.dumps(
+        ([CheckCalled], [(0, )]), cPickle.HIGHEST_PROTOCOL))
+    py.test.raises(cPickle.UnpicklingError, SubObjectTree.loads, evil,
+                   classes=[User])
+
+@py.test.mark.tree_only
+def test_selected_set(items, user, user2, user3):
+    items.get_selection().set_mode(gtk.SELECTION_MULTIPLE)
+    items.append(user)
+    items.append(user2, parent=user)
+    items.append(user3)
+    items.selected_items = [user]
+    refresh_gui()
+    assert user2 in items.selected_set
+    assert user3 not in items.selected_set
+    assert len(items.selected_set) == 2
+    items.expand_item(user)
+    refresh_gui()
+    assert items.selected_items == [user, user2]
+    items.remove(user2)
+    assert list(items.selected_set) == [user]
+    items.selected_items = [user, user3]
+    assert items.selected_items == [user, user3]
+
+@py.test.mark.tree_only
+def test_selected_set_in_handler(items, user, user2, user3):
+    items.get_selection().set_mode(gtk.SELECTION_MULTIPLE)
+    items.append(user)
+    items.append(user2, parent=user)
+    items.append(user3)
+    seen = []
+    items.connect('selection-changed',
+                  lambda tree: seen.append(list(tree.selected_items)))
+    items.selected_items = [user]
+    assert seen[-1] == [user, user2]
+    items.get_selection().select_iter(items._sort_iter_for(user3))
+    assert seen[-1] == [user, user2, user3]
+    items.get_selection().unselect_iter(items._sort_iter_for(user))
+    assert seen[-1] == [user3]
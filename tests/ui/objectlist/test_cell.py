@@ -121,3 +121,45 @@ def test_cell_props():
     cell = Cell('test', cell_props={'size': 100})
     renderer = cell.create_renderer(None, None)
     assert renderer.get_property('size') == 100
+
+def test_cell_render_cache():
+    from pygtkhelpers.ui.objectlist import ObjectList
+    calls = []
+    def format_func(value):
+        calls.append(value)
+        return str(value)
+    cell = Cell('test', format_func=format_func)
+    ol = ObjectList([Column('test', cells=[cell])], render_cache_size=10)
+    obj = Mock(test=1)
+    ol.append(obj)
+    renderer = Mock()
+    giter = ol.model.get_iter_first()
+    cell.cell_data_func(None, renderer, ol.model, giter, ol)
+    cell.cell_data_func(None, renderer, ol.model, giter, ol)
+    assert calls == [1]
+    assert renderer.set_properties.call_args[1] == {'text': '1'}
+    obj.test = 2
+    ol.update(obj)
+    cell.cell_data_func(None, renderer, ol.model, giter, ol)
+    assert calls == [1, 2]
+    ol.invalidate()
+    cell.cell_data_func(None, renderer, ol.model, giter, ol)
+    assert calls == [1, 2, 2]
+
+def test_cell_compile():
+    cell = Cell('test', format='hoo %s', mapped={'markup': 'markup_attr'})
+    cell.compile()
+    renderer = Mock()
+    cell.render(Mock(test=1, markup_attr='<b>x</b>'), renderer)
+    assert renderer.set_properties.call_args[1] == {'markup': '<b>x</b>',
+                                                    'text': 'hoo 1'}
+
+def test_cell_compile_custom_mapper():
+    calls = []
+    def mapper(cell, obj, renderer):
+        calls.append((cell, obj, renderer))
+    cell = Cell(None, mappers=[mapper])
+    cell.compile()
+    obj, renderer = object(), Mock()
+    cell.render(obj, renderer)
+    assert calls == [(cell, obj, renderer)]
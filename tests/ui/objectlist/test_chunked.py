@@ -0,0 +1,52 @@
+import py
+import numpy as np
+from pygtkhelpers.ui.objectlist import (ChunkedTable, NpyChunkReader,
+                                        VirtualObjectList, Column,
+                                        get_chunked_model)
+
+pd = py.test.importorskip('pandas')
+
+
+class CountingReader(NpyChunkReader):
+    def __init__(self, path):
+        NpyChunkReader.__init__(self, path)
+        self.reads = []
+
+    def read(self, start, stop):
+        self.reads.append((start, stop))
+        return NpyChunkReader.read(self, start, stop)
+
+
+def pytest_funcarg__npy_path(request):
+    tmpdir = request.getfuncargvalue('tmpdir')
+    rows = np.zeros(250, dtype=[('name', 'S8'), ('age', 'i4')])
+    rows['name'] = ['user%03d' % i for i in range(250)]
+    rows['age'] = np.arange(250) % 7
+    path = str(tmpdir.join('users.npy'))
+    np.save(path, rows)
+    return path
+
+def test_chunked_table(npy_path):
+    reader = CountingReader(npy_path)
+    table = ChunkedTable(reader, chunk_size=100, cache_size=2,
+                         prefetch=False)
+    assert len(table) == 250
+    assert table.item_at(5) == ('user005', 5)
+    assert table.item_at(99).name == 'user099'
+    assert reader.reads == [(0, 100)]
+    assert table.value_at(249, 1) == 249 % 7
+    assert reader.reads == [(0, 100), (200, 250)]
+    table.item_at(150)
+    table.item_at(0)
+    assert reader.reads[-1] == (0, 100)
+
+def test_chunked_model(npy_path):
+    table = ChunkedTable(NpyChunkReader(npy_path), chunk_size=100,
+                         prefetch=False)
+    df_py_dtypes, model = get_chunked_model(table)
+    assert len(model) == 250
+    assert list(model[120]) == ['user120', 120 % 7]
+    items = VirtualObjectList([Column('name', str), Column('age', int)],
+                              source=table)
+    assert len(items) == 250
+    assert items[3].name == 'user003'
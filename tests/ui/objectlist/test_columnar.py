@@ -0,0 +1,77 @@
+import copy
+import gc
+
+from flatland import Form, String, Integer
+from pygtkhelpers.ui.objectlist import CombinedFields
+
+
+def pytest_funcarg__combined(request):
+    form = Form.of(String.named('name').using(default='foo'),
+                   Integer.named('count').using(default=10))
+    return CombinedFields({'form': form}, enabled_attrs=None,
+                          storage='columnar')
+
+def count_attr(combined):
+    return combined.field_set_prefix % combined.uuid_mapping['form'] + \
+        'count'
+
+def test_columnar_row(combined):
+    row = combined.new_row()
+    attr = count_attr(combined)
+    assert getattr(row, attr) == 10
+    setattr(row, attr, 12)
+    assert row.get_row_fields('form').count == 12
+    assert row.get_row_fields('form').attrs == {'name': 'foo', 'count': 12}
+    assert combined.store.columns[attr].dtype.kind == 'i'
+    setattr(row, attr, None)
+    assert getattr(row, attr) is None
+
+def test_columnar_ids(combined):
+    rows = [combined.new_row() for i in range(3)]
+    combined.extend(rows)
+    combined.remove(rows[0])
+    assert [row.get_row_fields('__DefaultFields').id
+            for row in combined] == [1, 2]
+
+def test_columnar_column_values(combined):
+    rows = [combined.new_row() for i in range(3)]
+    combined.extend(rows)
+    attr = count_attr(combined)
+    combined.set_column_values(attr, [1, 2, 3])
+    assert list(combined.get_column_values(attr)) == [1, 2, 3]
+    assert getattr(rows[2], attr) == 3
+
+def test_columnar_release(combined):
+    row = combined.new_row()
+    slot = row._slot
+    setattr(row, count_attr(combined), 99)
+    del row
+    gc.collect()
+    row = combined.new_row()
+    assert row._slot == slot
+    assert getattr(row, count_attr(combined)) == 10
+
+def test_columnar_float_in_int_column(combined):
+    row = combined.new_row()
+    attr = count_attr(combined)
+    setattr(row, attr, 2.5)
+    assert getattr(row, attr) == 2.5
+    assert combined.store.columns[attr].dtype == object
+
+def test_columnar_bool_in_int_column(combined):
+    row = combined.new_row()
+    attr = count_attr(combined)
+    setattr(row, attr, True)
+    assert getattr(row, attr) is True
+    assert getattr(combined.new_row(), attr) == 10
+    assert combined.store.columns[attr].dtype == object
+
+def test_columnar_copy(combined):
+    row = combined.new_row()
+    attr = count_attr(combined)
+    setattr(row, attr, 12)
+    for row_copy in (copy.copy(row), copy.deepcopy(row)):
+        assert row_copy._slot != row._slot
+        assert getattr(row_copy, attr) == 12
+        setattr(row_copy, attr, 13)
+        assert getattr(row, attr) == 12
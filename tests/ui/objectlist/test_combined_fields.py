@@ -0,0 +1,51 @@
+from flatland import Form, String
+from pygtkhelpers.ui.objectlist import CombinedFields
+
+
+def pytest_funcarg__combined(request):
+    form = Form.of(String.named('name').using(default='foo'))
+    return CombinedFields({'form': form}, enabled_attrs=None)
+
+
+def row_ids(combined):
+    return [row.get_row_fields('__DefaultFields').id for row in combined]
+
+
+def test_row_ids_append(combined):
+    rows = [combined.new_row() for i in range(3)]
+    combined.extend(rows)
+    assert row_ids(combined) == [1, 2, 3]
+    combined.insert(0, combined.new_row())
+    assert row_ids(combined) == [1, 2, 3, 4]
+    combined.remove(rows[1])
+    assert row_ids(combined) == [1, 2, 3]
+
+
+def test_row_ids_set_items_reorder(combined):
+    rows = [combined.new_row() for i in range(3)]
+    combined.extend(rows)
+    combined.set_items(rows[::-1])
+    assert list(combined) == rows[::-1]
+    assert row_ids(combined) == [1, 2, 3]
+    assert rows[0].get_row_fields('__DefaultFields').id == 3
+
+
+def test_row_ids_set_items_replace(combined):
+    rows = [combined.new_row() for i in range(3)]
+    combined.extend(rows)
+    new_row = combined.new_row()
+    combined.set_items([rows[0], new_row, rows[2]])
+    assert row_ids(combined) == [1, 2, 3]
+    assert new_row.get_row_fields('__DefaultFields').id == 2
+
+
+def test_row_ids_batch_append_remove(combined):
+    rows = [combined.new_row() for i in range(3)]
+    combined.extend(rows)
+    with combined.batch():
+        new_row = combined.new_row()
+        combined.append(new_row)
+        combined.remove(new_row)
+        combined.remove(rows[0])
+    assert list(combined) == rows[1:]
+    assert row_ids(combined) == [1, 2]
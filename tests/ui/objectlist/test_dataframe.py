@@ -0,0 +1,104 @@
+import py
+import gtk
+from si_prefix import si_format
+from pygtkhelpers.ui.objectlist import (get_frame_model, add_columns,
+                                        set_column_format, get_py_dtypes,
+                                        get_list_store, _si_format_array)
+
+pd = py.test.importorskip('pandas')
+
+
+def pytest_funcarg__frame(request):
+    return pd.DataFrame({'name': ['Hans', 'Gretel', 'Witch'],
+                         'age': [10, 11, 409],
+                         'select': [False, True, False]},
+                        columns=['name', 'age', 'select'])
+
+def test_py_dtypes(frame):
+    df_py_dtypes = get_py_dtypes(frame)
+    assert df_py_dtypes.dtype.tolist() == [str, int, bool]
+    assert df_py_dtypes.i.tolist() == [0, 1, 2]
+
+def test_py_dtypes_mixed():
+    # A single value that is not a string, anywhere in the column, makes it
+    # an object column.
+    frame = pd.DataFrame({'name': ['x'] * 5000 + [None],
+                          'mixed': ['x'] * 5000 + [1]},
+                         columns=['name', 'mixed'])
+    df_py_dtypes = get_py_dtypes(frame)
+    assert df_py_dtypes.dtype.tolist() == [object, object]
+    df_py_dtypes, list_store = get_list_store(frame)
+    assert list_store[5000][1] == 1
+    assert list_store[5000][0] is None
+
+def test_list_store(frame):
+    df_py_dtypes, list_store = get_list_store(frame)
+    assert len(list_store) == 3
+    assert list(list_store[2]) == ['Witch', 409, False]
+
+def test_frame_model_values(frame):
+    df_py_dtypes, model = get_frame_model(frame)
+    assert len(model) == 3
+    assert model.get_column_type(1) == gobject_type(int)
+    assert list(model[1]) == ['Gretel', 11, True]
+    tree_view = gtk.TreeView()
+    add_columns(tree_view, df_py_dtypes, model)
+    assert len(tree_view.get_columns()) == 3
+
+def test_frame_model_write(frame):
+    df_py_dtypes, model = get_frame_model(frame)
+    model.set_value(model.get_iter((0, )), 1, 12)
+    assert frame.age[0] == 12
+    assert model[0][1] == 12
+
+def test_frame_changed(frame):
+    df_py_dtypes, model = get_frame_model(frame)
+    changed = []
+    model.connect('row-changed', lambda model, path, iter:
+                  changed.append(path))
+    frame.loc[:, 'select'] = True
+    model.frame_changed(rows=[0, 2], columns=['select'])
+    assert changed == [(0, ), (2, )]
+    assert [row[2] for row in model] == [True, True, True]
+
+def test_precomputed_format(frame):
+    df_py_dtypes, model = get_frame_model(frame)
+    tree_view = gtk.TreeView()
+    add_columns(tree_view, df_py_dtypes, model)
+    column = tree_view.get_column(1)
+    set_column_format(column, 1, '{value:03d}', precompute=True)
+    cell = column.get_cells()[0]
+
+    def text(row):
+        column.cell_set_cell_data(model, model.get_iter((row, )), False,
+                                  False)
+        return cell.get_property('text')
+    assert text(0) == '010'
+    model.set_value(model.get_iter((0, )), 1, 12)
+    assert text(0) == '012'
+    assert text(2) == '409'
+
+
+def test_precomputed_format_again(frame):
+    df_py_dtypes, model = get_frame_model(frame)
+    tree_view = gtk.TreeView()
+    add_columns(tree_view, df_py_dtypes, model)
+    column = tree_view.get_column(1)
+    set_column_format(column, 1, '{value:03d}', precompute=True)
+    formatted = column.get_cells()[0].get_data('pygtkhelpers::formatted')
+    set_column_format(column, 1, '{value:04d}', precompute=True)
+    # The strings of the first call are no longer updated.
+    assert not formatted._handlers
+    set_column_format(column, 1, '{value:05d}')
+    assert column.get_cells()[0].get_data('pygtkhelpers::formatted') is None
+
+
+def test_si_format_array():
+    values = [0, 1e-27, -1.764e-24, 0.0937537, 3.93766, 165.382, -6946.03,
+              999.999, 9.07785e+11, 6.51216e+29]
+    assert _si_format_array(values, 2).tolist() == [si_format(value, 2)
+                                                    for value in values]
+
+
+def gobject_type(py_type):
+    return gtk.ListStore(py_type).get_column_type(0)
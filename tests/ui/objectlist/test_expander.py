@@ -1,6 +1,7 @@
 import py
 from pygtkhelpers.utils import refresh_gui
 from pygtkhelpers.test import CheckCalled
+from .conftest import User
 
 @py.test.mark.tree_only
 def test_tree_expander_column(items):
@@ -61,4 +62,57 @@ def test_item_expanded(items, user, user2):
     refresh_gui()
     assert not items.item_expanded(user)
 
+@py.test.mark.tree_only
+def test_lazy_children(items, user, user2, user3):
+    loaded = []
+    def load(item):
+        loaded.append(item)
+        return [(user2, None), (user3, None)]
+    items.append(user, lazy_children=load)
+    assert list(items) == [user]
+    assert not items.children_loaded(user)
+    assert items.item_has_child(user)
+    item_expanded = CheckCalled(items, 'item-expanded')
+    items.expand_item(user)
+    refresh_gui()
+    assert loaded == [user]
+    assert item_expanded.called[1] is user
+    assert list(items) == [user, user2, user3]
+    assert items.children_loaded(user)
+    assert items.unload_collapsed() == 0
+    items.collapse_item(user)
+    assert items.unload_collapsed() == 1
+    assert list(items) == [user]
+    assert user2 not in items
+    items.expand_item(user)
+    assert loaded == [user, user]
 
+@py.test.mark.tree_only
+def test_lazy_children_threaded(items, user, user2, user3):
+    items.threaded_loading = True
+    items.append(user, lazy_children=lambda item: [(user2, None),
+                                                   (user3, None)])
+    items.expand_item(user)
+    refresh_gui(.1)
+    assert list(items) == [user, user2, user3]
+    assert items.children_loaded(user)
+    items.collapse_item(user)
+    assert items.unload_collapsed() == 1
+    assert list(items) == [user]
+
+@py.test.mark.tree_only
+def test_lazy_children_filtered_sorted(items, user, user2, user3):
+    def key(item):
+        assert isinstance(item, User)
+        return item.name
+    def load(item):
+        return [[user3, None], [user2, None]]
+    items.set_visible_func(lambda item: item.age < 100)
+    items.sort_by(key)
+    items.append(user, lazy_children=load)
+    # The placeholder keeps the expander, and is not sorted or filtered.
+    assert items.item_has_child(user)
+    items.expand_item(user)
+    refresh_gui()
+    assert list(items) == [user, user2, user3]
+    assert not items.item_visible(user3)
@@ -61,3 +61,19 @@ def _search_missing_func(item, key):
 def test_search_missing_func(searchcheck):
     searchcheck.ol.search_by(_search_missing_func)
     searchcheck.assert_selects('z', None)
+
+def test_search_attr_index(searchcheck):
+    searchcheck.ol.search_by('name', index=True)
+    searchcheck.assert_selects('b', searchcheck.u2)
+
+def test_find_all(items, user, user2, user3):
+    items.extend([user, user2, user3])
+    assert items.find_all('name', 'h') == [user, user3]
+    assert items.find_all('name', 'RETE') == [user2]
+    user.name = 'Greta'
+    items.update(user)
+    assert items.find_all('name', 'gret') == [user, user2]
+    items.remove(user2)
+    assert items.find_all('name', 'gret') == [user]
+    items.append(User(name='Margret', age=60))
+    assert len(items.find_all('name', 'gret')) == 2
@@ -6,9 +6,23 @@ from pygtkhelpers.utils import refresh_gui
 from pygtkhelpers.test import CheckCalled
 from mock import Mock
 
-def test_sort_by_attr_default(items):
+def test_sort_by_attr_default(items, user, user2, user3):
     items.sort_by('name')
-    assert items.model_sort.has_default_sort_func()
+    items.extend([user, user2, user3])
+    it = [i[0] for i in items.model_sort]
+    assert it == [user2, user, user3]
+
+def test_sort_by_keeps_order(items, user, user2, user3):
+    items.extend([user, user2, user3])
+    items.sort_by('name')
+    user3.name = 'Aaron'
+    items.update(user3)
+    assert list(items) == [user3, user2, user]
+    assert items.index(user3) == 0
+    items.sort_by(None)
+    user3.name = 'Zed'
+    items.update(user3)
+    assert list(items) == [user3, user2, user]
 
 def test_sort_by_attr_asc(items, user, user2, user3):
     items.extend([user, user2, user3])
@@ -85,6 +99,19 @@ def test_sort_by_col_desc(items, user, user2, user3):
     assert it[1] is user
     assert it[2] is user2
 
+def test_sort_by_col_header(items, user, user2, user3):
+    items.extend([user, user2, user3])
+    view_col = items.get_columns()[0]
+    view_col.clicked()
+    assert [row[0] for row in items.model_sort] == [user2, user, user3]
+    view_col.clicked()
+    assert [row[0] for row in items.model_sort] == [user3, user, user2]
+    # Only the view is sorted, so positions still refer to the list.
+    assert list(items) == [user, user2, user3]
+    assert not items._keeps_sorted()
+    items.move_item_down(user)
+    assert list(items) == [user2, user, user3]
+
 def test_sort_item_activated(items, user, user2, user3):
     items.extend([user, user2, user3])
     mock = Mock()
@@ -0,0 +1,90 @@
+import py
+from pygtkhelpers.ui.objectlist import VirtualObjectList
+from pygtkhelpers.utils import refresh_gui
+from .conftest import User, user_columns
+
+
+class CountingSource(object):
+    def __init__(self, items):
+        self.items = items
+        self.reads = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def item_at(self, index):
+        self.reads += 1
+        return self.items[index]
+
+
+def pytest_funcarg__users(request):
+    return [User(name='user%03d' % i, age=i % 7) for i in range(100)]
+
+def test_virtual_len(users):
+    items = VirtualObjectList(user_columns, source=users)
+    assert len(items) == 100
+    assert items[5] is users[5]
+    assert users[5] in items
+
+def test_virtual_lazy():
+    source = CountingSource([User(name=str(i), age=i) for i in range(1000)])
+    items = VirtualObjectList(user_columns, source=source, cache_size=10)
+    refresh_gui()
+    # Nothing is displayed, so (almost) nothing is materialized.
+    assert source.reads < 1000
+    assert items.model.item_at(999) is source.items[999]
+
+def test_virtual_selected_item(users):
+    items = VirtualObjectList(user_columns, source=users)
+    items.selected_item = users[3]
+    assert items.selected_item is users[3]
+
+def test_virtual_sort_by(users):
+    items = VirtualObjectList(user_columns, source=users)
+    items.sort_by('age', '-')
+    ages = [row[0].age for row in items.model]
+    assert ages == sorted(ages, reverse=True)
+    # The source is not reordered.
+    assert items[0] is users[0]
+
+def test_virtual_visible_func(users):
+    items = VirtualObjectList(user_columns, source=users)
+    items.set_visible_func(lambda user: user.age == 0)
+    assert len(items.model) == len([u for u in users if u.age == 0])
+    assert items.item_visible(users[0])
+    assert not items.item_visible(users[1])
+
+def test_virtual_refresh(users):
+    items = VirtualObjectList(user_columns, source=users)
+    users.append(User(name='new', age=1))
+    items.refresh()
+    assert len(items.model) == 101
+    assert items.model.item_at(100) is users[-1]
+
+def test_virtual_update(users):
+    items = VirtualObjectList(user_columns, source=users)
+    items.model.item_at(2)
+    users[2].name = 'changed'
+    changed = []
+    items.model.connect('row-changed',
+                        lambda model, path, iter: changed.append(path))
+    items.update(users[2])
+    assert changed == [(2, )]
+    assert items.model[2][0].name == 'changed'
+
+def test_virtual_read_only(users):
+    items = VirtualObjectList(user_columns, source=users)
+    py.test.raises(TypeError, items.clear)
+    py.test.raises(TypeError, items.move_item_down, users[0])
+    assert len(items) == 100
+
+def test_virtual_source_index(users):
+    items = VirtualObjectList(user_columns, source=users, cache_size=2)
+    assert items.index(users[50]) == 50
+    users.insert(0, User(name='first', age=0))
+    assert items.source.index(users[51]) == 51
+    py.test.raises(ValueError, items.source.index, User(name='none', age=0))
+    users[3] = User(name='replaced', age=0)
+    items.refresh()
+    assert items.index(users[3]) == 3
+    py.test.raises(ValueError, items.source.index, User(name='x', age=0))
@@ -0,0 +1,64 @@
+import py
+import numpy as np
+from pygtkhelpers.ui.views.select import ListSelect
+
+pd = py.test.importorskip('pandas')
+
+
+def pytest_funcarg__frame(request):
+    return pd.DataFrame({'name': ['Hans', 'Gretel', 'Witch'],
+                         'age': [10, 11, 409],
+                         'select': [False, True, False]},
+                        columns=['name', 'age', 'select'])
+
+
+def pytest_generate_tests(metafunc):
+    if 'view' in metafunc.funcargnames:
+        metafunc.addcall(id='list_store', param=False)
+        metafunc.addcall(id='frame_model', param=True)
+
+
+def pytest_funcarg__view(request):
+    view = ListSelect()
+    view.frame_model = request.param
+    view.set_data(request.getfuncargvalue('frame'))
+    signals = view.signals = []
+    view.connect('selection-changed',
+                 lambda view, changed: signals.append(changed.tolist()))
+    return view
+
+
+def selected(view):
+    column_i = view.df_py_dtypes.ix[view.select_column].i
+    return [row[column_i] for row in view.list_store]
+
+
+def test_set_mask(view):
+    changed = view.set_mask([True, True, False])
+    assert changed.tolist() == [0]
+    assert view.df_data['select'].tolist() == [True, True, False]
+    assert selected(view) == [True, True, False]
+    assert view.signals == [[0]]
+    # Nothing changed, so no signal is emitted.
+    assert not view.set_mask(np.array([True, True, False])).size
+    assert view.signals == [[0]]
+
+
+def test_set_mask_detached(view):
+    view.detach_threshold = 1
+    view.set_mask([False, False, True])
+    assert selected(view) == [False, False, True]
+    assert view.treeview_select.get_model() is view.list_store
+
+
+def test_set_mask_size(view):
+    py.test.raises(ValueError, view.set_mask, [True])
+
+
+def test_select_where(view):
+    changed = view.select_where('age > 10')
+    assert changed.tolist() == [2]
+    assert selected(view) == [False, True, True]
+    view.select_none()
+    assert selected(view) == [False, False, False]
+    assert view.signals == [[2], [1, 2]]
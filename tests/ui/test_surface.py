@@ -0,0 +1,85 @@
+import py
+import gtk
+from pygtkhelpers.ui.views.surface import LayerAlphaController
+
+pd = py.test.importorskip('pandas')
+
+
+def pytest_funcarg__view(request):
+    view = LayerAlphaController()
+    view.set_surfaces(pd.DataFrame({'alpha': [1., .5, .25]},
+                                   index=pd.Index(['a', 'b', 'c'],
+                                                  name='name')))
+    signals = view.signals = []
+    for signal in ('alpha-changed', 'alphas-changed', 'layers-reordered'):
+        view.connect(signal, lambda view, *args: signals.append(args))
+    return view
+
+
+def move_row(list_store, source, target):
+    # Dragging a row inserts a copy at the target, then deletes the source.
+    row = list(list_store[source])
+    list_store.insert(target, row)
+    if source >= target:
+        source += 1
+    list_store.remove(list_store.get_iter((source, )))
+
+
+def test_df_surfaces(view):
+    df_surfaces = view.df_surfaces
+    assert df_surfaces.index.tolist() == ['a', 'b', 'c']
+    assert df_surfaces.index.name == 'name'
+    assert df_surfaces.alpha.tolist() == [1., .5, .25]
+
+
+def test_reorder(view):
+    move_row(view.list_store, 0, 3)
+    assert view.signals == [([1, 2, 0], )]
+    assert view.df_surfaces.index.tolist() == ['b', 'c', 'a']
+    assert view.df_surfaces.alpha.tolist() == [.5, .25, 1.]
+    move_row(view.list_store, 2, 1)
+    assert view.df_surfaces.index.tolist() == ['b', 'a', 'c']
+    assert view._positions == {'b': 0, 'a': 1, 'c': 2}
+
+
+def test_set_alpha_reordered(view):
+    move_row(view.list_store, 2, 0)
+    view.set_alpha('b', .75)
+    assert [tuple(row) for row in view.list_store] == [('c', .25),
+                                                        ('a', 1.),
+                                                        ('b', .75)]
+    assert view.df_surfaces.alpha.tolist() == [.25, 1., .75]
+    assert view.signals[-2:] == [('b', .75), ({'b': .75}, )]
+
+
+def test_remove_row(view):
+    view.list_store.remove(view.list_store.get_iter((0, )))
+    assert view.df_surfaces.index.tolist() == ['b', 'c']
+    assert view._positions == {'b': 0, 'c': 1}
+    view.set_alpha('c', 0.)
+    assert view.list_store[1][1] == 0.
+
+
+def test_set_df_surfaces(view):
+    move_row(view.list_store, 0, 3)
+    view.df_surfaces = pd.DataFrame({'alpha': [.1, .2]},
+                                    index=pd.Index(['x', 'y'], name='name'))
+    assert view.df_surfaces.index.tolist() == ['x', 'y']
+    assert view._positions == {'x': 0, 'y': 1}
+    assert [tuple(row) for row in view.list_store] == [('x', .1), ('y', .2)]
+
+
+def test_alpha_signals_throttled(view):
+    view.treeview_layers.get_selection().select_path((1, ))
+    adjustment = gtk.Adjustment(100, 0, 100)
+    for value in (40, 30, 20):
+        adjustment.set_value(value)
+        view.on_adjustment_alpha__value_changed(adjustment)
+    # The alpha is set at once, but the signals wait for the timeout.
+    assert view.list_store[1][1] == .2
+    assert view.signals == []
+    view.flush_alpha_signals()
+    assert view.signals == [('b', .2), ({'b': .2}, )]
+    assert view._alpha_source is None
+    view.flush_alpha_signals()
+    assert len(view.signals) == 2